@@ -0,0 +1,211 @@
+"""
+⚙️ Execution backends for the Hypervelocity Orchestrator
+Async subprocesses for shell commands, a thread pool for blocking I/O and a
+process pool for CPU-bound Python callables
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import signal
+import time
+from collections import deque
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+try:
+    import resource
+except ImportError:  # not on Windows: resource limits are unavailable
+    resource = None
+
+
+class TaskExecutionError(Exception):
+    """The task ran but did not succeed (non-zero exit, limit exceeded, timeout)"""
+
+
+def _apply_limits(cpu_seconds: Optional[int], memory_mb: Optional[int]):
+    if cpu_seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _cpu_limit_exceeded(signum, frame):
+    raise TaskExecutionError("CPU time limit exceeded")
+
+
+def run_with_limits(func: Callable, args: tuple, cpu_seconds: Optional[int], memory_mb: Optional[int]) -> Any:
+    """Run `func` in a pool worker under soft CPU/memory limits, restored afterwards
+
+    Only soft limits are lowered, so the worker can lift them again for the
+    next task; exceeding them raises instead of killing the worker.
+    """
+    saved_cpu = resource.getrlimit(resource.RLIMIT_CPU)
+    saved_as = resource.getrlimit(resource.RLIMIT_AS)
+    previous_handler = signal.signal(signal.SIGXCPU, _cpu_limit_exceeded)
+    try:
+        if cpu_seconds:
+            used = resource.getrusage(resource.RUSAGE_SELF)
+            budget = int(used.ru_utime + used.ru_stime) + cpu_seconds
+            resource.setrlimit(resource.RLIMIT_CPU, (budget, saved_cpu[1]))
+        if memory_mb:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_mb * 1024 * 1024, saved_as[1]))
+        try:
+            return func(*args)
+        except MemoryError:
+            raise TaskExecutionError(f"Memory limit of {memory_mb} MB exceeded")
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, saved_cpu)
+        resource.setrlimit(resource.RLIMIT_AS, saved_as)
+        signal.signal(signal.SIGXCPU, previous_handler)
+
+
+class ExecutionBackend:
+    """Runs one task; the orchestrator bounds how many run at once"""
+
+    name = "base"
+    supports_limits = False
+
+    def validate(self, task):
+        if (task.cpu_seconds or task.memory_mb) and not (self.supports_limits and resource is not None):
+            raise ValueError(f"Task {task.id}: backend '{self.name}' cannot enforce resource limits")
+
+    async def run(self, task) -> Any:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class SubprocessBackend(ExecutionBackend):
+    """Run `task.command` through the shell with stdout/stderr streamed to files
+
+    Output goes to <output_dir>/<task id>.out/.err as it is produced; only the
+    last `tail_bytes` of each stream are kept in memory for the result.
+    """
+
+    name = "subprocess"
+    supports_limits = True
+
+    def __init__(self, output_dir: Path, tail_bytes: int = 4096, chunk_size: int = 64 * 1024):
+        self.output_dir = Path(output_dir)
+        self.tail_bytes = tail_bytes
+        self.chunk_size = chunk_size
+
+    def validate(self, task):
+        super().validate(task)
+        if not task.command:
+            raise ValueError(f"Task {task.id}: subprocess backend needs a command")
+
+    async def _pump(self, stream: asyncio.StreamReader, path: Path):
+        """Copy a stream to `path`; returns (tail, sha256 of the whole stream)"""
+        digest = hashlib.sha256()
+        tail = deque()
+        kept = 0
+        with open(path, "wb") as sink:
+            while True:
+                chunk = await stream.read(self.chunk_size)
+                if not chunk:
+                    break
+                sink.write(chunk)
+                digest.update(chunk)
+                tail.append(chunk)
+                kept += len(chunk)
+                while kept - len(tail[0]) >= self.tail_bytes:
+                    kept -= len(tail.popleft())
+        return b"".join(tail)[-self.tail_bytes:], digest.hexdigest()
+
+    async def run(self, task) -> Any:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = re.sub(r"[^A-Za-z0-9_.-]", "_", task.id)
+        stdout_path = self.output_dir / f"{stem}.out"
+        stderr_path = self.output_dir / f"{stem}.err"
+        limits = None
+        if task.cpu_seconds or task.memory_mb:
+            limits = lambda: _apply_limits(task.cpu_seconds, task.memory_mb)
+
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_shell(
+            task.command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=task.cwd,
+            preexec_fn=limits,
+            start_new_session=True,
+        )
+        try:
+            (stdout_tail, stdout_sha256), (stderr_tail, _), returncode = await asyncio.wait_for(
+                asyncio.gather(
+                    self._pump(process.stdout, stdout_path),
+                    self._pump(process.stderr, stderr_path),
+                    process.wait(),
+                ),
+                task.timeout,
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Kill the whole process group, not just the shell
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            if isinstance(e, asyncio.TimeoutError):
+                raise TaskExecutionError(f"Timed out after {task.timeout}s")
+            raise
+
+        if returncode != 0:
+            reason = f"signal {-returncode}" if returncode < 0 else f"exit code {returncode}"
+            detail = stderr_tail.decode(errors="replace").strip().splitlines()[-1:] or [""]
+            raise TaskExecutionError(f"Command failed with {reason}: {detail[0]}")
+        return {
+            "success": True,
+            "returncode": returncode,
+            "duration": time.perf_counter() - start,
+            "stdout_path": str(stdout_path),
+            "stderr_path": str(stderr_path),
+            "stdout_tail": stdout_tail.decode(errors="replace"),
+            "stdout_sha256": stdout_sha256,
+        }
+
+
+class ThreadBackend(ExecutionBackend):
+    """Run `task.func(*task.args)` on the thread pool; for blocking I/O"""
+
+    name = "thread"
+
+    def __init__(self, executor: Executor):
+        self.executor = executor
+
+    def validate(self, task):
+        super().validate(task)
+        if task.func is None:
+            raise ValueError(f"Task {task.id}: thread backend needs a func")
+
+    async def run(self, task) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, task.func, *task.args)
+
+
+class ProcessBackend(ExecutionBackend):
+    """Run a picklable `task.func(*task.args)` in the process pool; for CPU-bound work"""
+
+    name = "process"
+    supports_limits = True
+
+    def __init__(self, executor: Executor):
+        self.executor = executor
+
+    def validate(self, task):
+        super().validate(task)
+        if task.func is None:
+            raise ValueError(f"Task {task.id}: process backend needs a func")
+
+    async def run(self, task) -> Any:
+        loop = asyncio.get_running_loop()
+        if task.cpu_seconds or task.memory_mb:
+            return await loop.run_in_executor(
+                self.executor, run_with_limits, task.func, task.args, task.cpu_seconds, task.memory_mb
+            )
+        return await loop.run_in_executor(self.executor, task.func, *task.args)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Orchestrator scheduling benchmarks
+Runs synthetic DAGs whose tasks sleep for a generated duration (or not at all),
+measuring scheduler overhead per task, makespan against the ideal and peak memory
+
+Usage:
+    python3 benchmarks/run.py --tasks 1000000
+    python3 benchmarks/run.py --shape all --tasks 1000,10000,100000 --output results/base.json
+    python3 benchmarks/run.py --shape skewed,layered --tasks 10000 --time-scale 0.001
+    python3 benchmarks/run.py --shape all --tasks 100000 --compare results/base.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from backends import ExecutionBackend  # noqa: E402
+from orchestrator import HypervelocityOrchestrator, Task  # noqa: E402
+
+
+class SleepBackend(ExecutionBackend):
+    """Sleeps for the task's duration times `time_scale`; with 0 completes immediately"""
+
+    name = "sleep"
+
+    def __init__(self, time_scale: float):
+        self.time_scale = time_scale
+
+    async def run(self, task):
+        if self.time_scale:
+            await asyncio.sleep(task.args[0] * self.time_scale)
+        return None
+
+
+def task(task_id: str, dependencies: List[str], duration: float = 1.0) -> Task:
+    return Task(task_id, task_id, "sleep", dependencies, backend="sleep", args=(duration,))
+
+
+# Every shape lists tasks in topological order; durations are in abstract units (mean about 1)
+
+def independent(n: int, rng: random.Random) -> List[Task]:
+    return [task(f"t{i}", [], rng.uniform(0.5, 1.5)) for i in range(n)]
+
+
+def chains(n: int, rng: random.Random, length: int = 10) -> List[Task]:
+    return [task(f"t{i}", [f"t{i - 1}"] if i % length else [], rng.uniform(0.5, 1.5)) for i in range(n)]
+
+
+def fanout(n: int, rng: random.Random) -> List[Task]:
+    """One root, n - 2 tasks that need only the root, and one sink that needs them all"""
+    middle = [f"t{i}" for i in range(1, n - 1)]
+    return (
+        [task("t0", [], rng.uniform(0.5, 1.5))]
+        + [task(task_id, ["t0"], rng.uniform(0.5, 1.5)) for task_id in middle]
+        + [task(f"t{n - 1}", middle, rng.uniform(0.5, 1.5))]
+    )
+
+
+def diamonds(n: int, rng: random.Random, depth: int = 10) -> List[Task]:
+    """Independent stacks of `depth` diamonds: top -> left, right -> bottom -> next top"""
+    tasks = []
+    for i in range(n):
+        role = i % 4
+        if role == 0:
+            dependencies = [f"t{i - 1}"] if i % (4 * depth) else []
+        elif role == 3:
+            dependencies = [f"t{i - 2}", f"t{i - 1}"]
+        else:
+            dependencies = [f"t{i - role}"]
+        tasks.append(task(f"t{i}", dependencies, rng.uniform(0.5, 1.5)))
+    return tasks
+
+
+def layered(n: int, rng: random.Random, heavy_tail: bool = False) -> List[Task]:
+    """Layers of up to 1000 tasks, each needing 1-3 random tasks of the layer before"""
+    width = max(1, min(1000, n // 10))
+    tasks = []
+    for i in range(n):
+        layer_start = i - i % width
+        previous = range(max(0, layer_start - width), layer_start)
+        dependencies = [f"t{j}" for j in sorted(set(rng.choices(previous, k=rng.randint(1, 3))))] if previous else []
+        # Pareto with alpha 1.5: most tasks short, a few orders of magnitude longer
+        duration = min(rng.paretovariate(1.5) / 3, 1000.0) if heavy_tail else rng.uniform(0.5, 1.5)
+        tasks.append(task(f"t{i}", dependencies, duration))
+    return tasks
+
+
+def skewed(n: int, rng: random.Random) -> List[Task]:
+    return layered(n, rng, heavy_tail=True)
+
+
+SHAPES = {
+    "independent": independent,
+    "chains": chains,
+    "fanout": fanout,
+    "diamonds": diamonds,
+    "layered": layered,
+    "skewed": skewed,
+}
+
+
+def critical_path(tasks: List[Task]) -> Tuple[float, float, int]:
+    """(longest path, total work, edges) in duration units"""
+    finish: Dict[str, float] = {}
+    work = 0.0
+    edges = 0
+    for t in tasks:
+        duration = t.args[0]
+        finish[t.id] = max((finish[d] for d in t.dependencies), default=0.0) + duration
+        work += duration
+        edges += len(t.dependencies)
+    return max(finish.values(), default=0.0), work, edges
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if platform.system() == "Darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_shape(shape: str, n: int, workers: int, time_scale: float = 0.0, seed: int = 0) -> dict:
+    baseline_rss = peak_rss_mb()
+    orchestrator = HypervelocityOrchestrator(max_workers=workers)
+    orchestrator.backends["sleep"] = SleepBackend(time_scale)
+
+    start = time.perf_counter()
+    tasks = SHAPES[shape](n, random.Random(seed))
+    build_seconds = time.perf_counter() - start
+    path, work, edges = critical_path(tasks)
+    # No schedule on `workers` workers can beat either bound
+    ideal = max(path, work / workers) * time_scale
+
+    completed = 0
+    start = time.perf_counter()
+    async for _, result in orchestrator.iter_results(tasks):
+        completed += not isinstance(result, BaseException)
+    run_seconds = time.perf_counter() - start
+    await orchestrator.shutdown()
+
+    return {
+        "shape": shape,
+        "tasks": n,
+        "edges": edges,
+        "completed": completed,
+        "max_workers": workers,
+        "time_scale": time_scale,
+        "seed": seed,
+        "build_seconds": round(build_seconds, 3),
+        "run_seconds": round(run_seconds, 3),
+        "critical_path_seconds": round(path * time_scale, 3),
+        "work_seconds": round(work * time_scale, 3),
+        "ideal_makespan_seconds": round(ideal, 3),
+        "makespan_ratio": round(run_seconds / ideal, 3) if ideal else None,
+        "overhead_us_per_task": round(max(run_seconds - ideal, 0.0) / n * 1e6, 2),
+        "tasks_per_second": round(n / run_seconds, 1),
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def run_isolated(shape: str, n: int, args) -> dict:
+    """One run in a fresh interpreter, so peak RSS belongs to that run alone"""
+    command = [sys.executable, __file__, "--shape", shape, "--tasks", str(n), "--workers", str(args.workers),
+               "--time-scale", str(args.time_scale), "--seed", str(args.seed)]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output)["runs"][0]
+
+
+def compare(baseline: dict, report: dict):
+    """Print each run next to the matching run in `baseline`"""
+    def key(run):
+        return run["shape"], run["tasks"], run["max_workers"], run["time_scale"]
+
+    def change(old, new):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    old_runs = {key(run): run for run in baseline["runs"]}
+    print(f"\nCompared with {baseline.get('revision') or 'baseline'}:")
+    print(f"{'shape':<12} {'tasks':>8} {'overhead µs/task':>24} {'makespan ratio':>20} {'peak RSS MB':>22}")
+    for run in report["runs"]:
+        old = old_runs.get(key(run))
+        if old is None:
+            print(f"{run['shape']:<12} {run['tasks']:>8}   (no baseline run)")
+            continue
+        ratio = (f"{old['makespan_ratio']} -> {run['makespan_ratio']}"
+                 if run["makespan_ratio"] is not None and old["makespan_ratio"] is not None else "-")
+        print(f"{run['shape']:<12} {run['tasks']:>8} "
+              f"{old['overhead_us_per_task']:>7} -> {run['overhead_us_per_task']:<7} "
+              f"{change(old['overhead_us_per_task'], run['overhead_us_per_task']):>7} "
+              f"{ratio:>20} "
+              f"{old['peak_rss_mb']:>6} -> {run['peak_rss_mb']:<6} {change(old['peak_rss_mb'], run['peak_rss_mb']):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Orchestrator scheduling benchmarks over synthetic DAGs')
+    parser.add_argument('--shape', default='chains',
+                        help=f"Comma-separated shapes, or 'all' ({', '.join(SHAPES)})")
+    parser.add_argument('--tasks', default='100000', help='Comma-separated task counts, e.g. 1000,10000,1000000')
+    parser.add_argument('--workers', type=int, default=50, help='Orchestrator max_workers')
+    parser.add_argument('--time-scale', type=float, default=0.0,
+                        help='Seconds per duration unit; 0 runs tasks instantly to measure pure overhead')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for random shapes and durations')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per shape and size; the median is kept')
+    parser.add_argument('--output', help='Write results JSON to this file')
+    parser.add_argument('--compare', help='Results JSON from an earlier run to compare against')
+    args = parser.parse_args()
+
+    shapes = list(SHAPES) if args.shape == 'all' else args.shape.split(',')
+    unknown = set(shapes) - set(SHAPES)
+    if unknown:
+        parser.error(f"Unknown shape(s): {', '.join(sorted(unknown))}")
+    sizes = [int(size) for size in args.tasks.split(',')]
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if len(shapes) * len(sizes) == 1 and args.repeat == 1:
+        runs = [asyncio.run(run_shape(shapes[0], sizes[0], args.workers, args.time_scale, args.seed))]
+    else:
+        runs = []
+        for shape in shapes:
+            for size in sizes:
+                # Small runs are noisy; the median of several is what --compare should see
+                attempts = sorted((run_isolated(shape, size, args) for _ in range(args.repeat)),
+                                  key=lambda run: run["run_seconds"])
+                runs.append(dict(attempts[len(attempts) // 2], repeats=len(attempts)))
+                print(f"{shape} x {size}: {runs[-1]['overhead_us_per_task']} µs/task", file=sys.stderr)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(text + "\n")
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
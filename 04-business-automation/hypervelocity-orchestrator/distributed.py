@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+🌐 Distributed mode for the Hypervelocity Orchestrator
+A coordinator (inside the orchestrator process) leases tasks to worker
+processes over TCP or Unix sockets; workers heartbeat, return results, and
+have queued leases stolen when another worker runs dry
+
+Usage:
+    python3 distributed.py worker --connect tcp://coordinator:7700 --slots 8
+    python3 distributed.py demo --workers 3 --tasks 300 --kill-one
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import hashlib
+import hmac
+import itertools
+import logging
+import os
+import pickle
+import secrets
+import socket
+import struct
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from backends import ExecutionBackend, ProcessBackend, SubprocessBackend, TaskExecutionError, ThreadBackend
+
+logger = logging.getLogger(__name__)
+
+# Frame: 4-byte payload length, 32-byte HMAC-SHA256 of the payload, pickled payload.
+# The MAC is checked before unpickling, so only holders of the token can send objects.
+HEADER = struct.Struct(">I")
+MAC_SIZE = 32
+MAX_FRAME = 256 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """A peer sent a malformed, oversized or unauthenticated frame"""
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """'tcp://host:port' -> ('tcp', (host, port)); 'unix:///path' -> ('unix', path)"""
+    if address.startswith("unix://"):
+        return "unix", address[len("unix://"):]
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://"):].rpartition(":")
+        return "tcp", (host or "0.0.0.0", int(port))
+    raise ValueError(f"Unsupported address '{address}' (use tcp://host:port or unix:///path)")
+
+
+async def send_message(writer: asyncio.StreamWriter, token: bytes, message: dict):
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    mac = hmac.new(token, payload, hashlib.sha256).digest()
+    writer.write(HEADER.pack(len(payload)) + mac + payload)
+    await writer.drain()
+
+
+async def read_message(reader: asyncio.StreamReader, token: bytes) -> dict:
+    """Next message, or raises asyncio.IncompleteReadError when the peer is gone"""
+    header = await reader.readexactly(HEADER.size + MAC_SIZE)
+    (size,) = HEADER.unpack_from(header)
+    if size > MAX_FRAME:
+        raise ProtocolError(f"Frame of {size} bytes exceeds {MAX_FRAME}")
+    payload = await reader.readexactly(size)
+    if not hmac.compare_digest(header[HEADER.size:], hmac.new(token, payload, hashlib.sha256).digest()):
+        raise ProtocolError("Frame failed authentication")
+    return pickle.loads(payload)
+
+
+@dataclasses.dataclass(eq=False)
+class Lease:
+    id: int
+    task: Any
+    future: asyncio.Future
+    worker: "WorkerConnection"
+    expires: float
+    revoking: bool = False
+
+
+@dataclasses.dataclass(eq=False)
+class WorkerConnection:
+    name: str
+    slots: int
+    writer: asyncio.StreamWriter
+    leases: Dict[int, Lease] = dataclasses.field(default_factory=dict)
+
+
+class Coordinator:
+    """Hands submitted tasks to connected workers under expiring leases
+
+    Each worker holds at most `slots + prefetch` leases. Leases are renewed
+    by the worker's heartbeats; a lease not renewed within `lease_ttl`
+    seconds (dead or partitioned worker) is requeued and the worker dropped,
+    as is every lease of a worker whose connection closes. When the queue is
+    empty and a worker has free slots, the newest lease of the most loaded
+    worker is revoked, if not yet started, and re-leased to it (work
+    stealing). Delivery is at-least-once: a requeued task may run twice.
+    """
+
+    def __init__(self, address: str, token: str, lease_ttl: float = 10.0, prefetch: int = 2):
+        self.address = address
+        self.token = token.encode()
+        self.lease_ttl = lease_ttl
+        self.prefetch = prefetch
+        self.pending: Deque[Tuple[Any, asyncio.Future]] = deque()
+        self.workers: Dict[str, WorkerConnection] = {}
+        self.leases: Dict[int, Lease] = {}
+        self.completed: Counter = Counter()
+        self.requeued = 0
+        self.stolen = 0
+        self._lease_ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def start(self):
+        kind, where = parse_address(self.address)
+        if kind == "unix":
+            if os.path.exists(where):
+                os.unlink(where)
+            self._server = await asyncio.start_unix_server(self._serve, path=where)
+        else:
+            self._server = await asyncio.start_server(self._serve, *where)
+        self._reaper = asyncio.create_task(self._reap())
+        logger.info(f"🌐 Coordinator listening on {self.address}")
+
+    async def close(self):
+        if self._server is None:
+            return
+        self._reaper.cancel()
+        self._server.close()
+        workers, self.workers = list(self.workers.values()), {}
+        for worker in workers:
+            worker.writer.close()
+        for _, future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self._server = None
+
+    def submit(self, task) -> asyncio.Future:
+        """Queue a task for the next free worker; the future gets its result"""
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() and self._cancelled(task, f))
+        self.pending.append((task, future))
+        self._dispatch()
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": {name: {"slots": w.slots, "leases": len(w.leases)} for name, w in self.workers.items()},
+            "completed": dict(self.completed),
+            "pending": len(self.pending),
+            "leased": len(self.leases),
+            "requeued": self.requeued,
+            "stolen": self.stolen,
+        }
+
+    def _send(self, worker: WorkerConnection, message: dict):
+        # Fire and forget: a failed send shows up as the connection closing
+        asyncio.create_task(self._send_quietly(worker, message))
+
+    async def _send_quietly(self, worker: WorkerConnection, message: dict):
+        try:
+            await send_message(worker.writer, self.token, message)
+        except (ConnectionError, RuntimeError):
+            pass
+
+    def _dispatch(self):
+        while self.pending:
+            # Least-loaded worker with room, by leases per slot
+            candidates = [w for w in self.workers.values() if len(w.leases) < w.slots + self.prefetch]
+            if not candidates:
+                break
+            worker = min(candidates, key=lambda w: len(w.leases) / w.slots)
+            task, future = self.pending.popleft()
+            if future.done():
+                continue
+            lease = Lease(next(self._lease_ids), task, future, worker, time.monotonic() + self.lease_ttl)
+            self.leases[lease.id] = lease
+            worker.leases[lease.id] = lease
+            self._send(worker, {"type": "lease", "lease": lease.id,
+                                "task": dataclasses.replace(task, dependencies=[], result=None)})
+        if not self.pending:
+            self._steal()
+
+    def _steal(self):
+        for thief in self.workers.values():
+            if len(thief.leases) >= thief.slots:
+                continue
+            # Only leases beyond a worker's slots can still be waiting in its queue
+            victims = [w for w in self.workers.values()
+                       if w is not thief and len(w.leases) - sum(l.revoking for l in w.leases.values()) > w.slots]
+            if not victims:
+                return
+            victim = max(victims, key=lambda w: len(w.leases) - w.slots)
+            lease = next(l for l in reversed(list(victim.leases.values())) if not l.revoking)
+            lease.revoking = True
+            self._send(victim, {"type": "revoke", "lease": lease.id})
+
+    def _requeue(self, lease: Lease, front: bool = True):
+        self.leases.pop(lease.id, None)
+        lease.worker.leases.pop(lease.id, None)
+        if lease.future.done():
+            return
+        if front:
+            self.pending.appendleft((lease.task, lease.future))
+        else:
+            self.pending.append((lease.task, lease.future))
+
+    def _cancelled(self, task, future: asyncio.Future):
+        for lease in list(self.leases.values()):
+            if lease.future is future:
+                self.leases.pop(lease.id, None)
+                lease.worker.leases.pop(lease.id, None)
+                self._send(lease.worker, {"type": "cancel", "lease": lease.id})
+
+    def _drop_worker(self, worker: WorkerConnection, reason: str):
+        if self.workers.get(worker.name) is not worker:
+            return
+        del self.workers[worker.name]
+        worker.writer.close()
+        leases = list(worker.leases.values())
+        for lease in leases:
+            self._requeue(lease)
+        self.requeued += len(leases)
+        logger.warning(f"⚠️  Worker {worker.name} dropped ({reason}); {len(leases)} leases requeued")
+        self._dispatch()
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(self.lease_ttl / 4)
+            now = time.monotonic()
+            for worker in {lease.worker for lease in self.leases.values() if lease.expires < now}:
+                self._drop_worker(worker, "lease expired")
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        worker = None
+        try:
+            hello = await asyncio.wait_for(read_message(reader, self.token), self.lease_ttl)
+            if hello.get("type") != "hello":
+                raise ProtocolError("Expected hello")
+            name = hello["worker"]
+            if name in self.workers:
+                self._drop_worker(self.workers[name], "reconnected")
+            worker = WorkerConnection(name, max(1, int(hello["slots"])), writer)
+            self.workers[name] = worker
+            await send_message(writer, self.token, {"type": "welcome", "heartbeat": self.lease_ttl / 3})
+            logger.info(f"🤝 Worker {name} joined with {worker.slots} slots")
+            self._dispatch()
+            while True:
+                message = await read_message(reader, self.token)
+                self._handle(worker, message)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (ProtocolError, asyncio.TimeoutError, KeyError, ValueError, pickle.UnpicklingError) as e:
+            logger.warning(f"⚠️  Rejected worker connection: {e}")
+        finally:
+            if worker is not None:
+                self._drop_worker(worker, "disconnected")
+            else:
+                writer.close()
+
+    def _handle(self, worker: WorkerConnection, message: dict):
+        kind = message["type"]
+        if kind == "heartbeat":
+            expires = time.monotonic() + self.lease_ttl
+            for lease in worker.leases.values():
+                lease.expires = expires
+        elif kind == "result":
+            lease = self.leases.pop(message["lease"], None)
+            if lease is None or lease.worker is not worker:
+                return  # requeued or cancelled meanwhile
+            del worker.leases[lease.id]
+            self.completed[worker.name] += 1
+            if not lease.future.done():
+                if message["ok"]:
+                    lease.future.set_result(message["result"])
+                else:
+                    lease.future.set_exception(message["error"])
+            self._dispatch()
+        elif kind == "revoked":
+            lease = self.leases.get(message["lease"])
+            if lease is None:
+                return
+            if message["ok"]:
+                self._requeue(lease)
+                self.stolen += 1
+                self._dispatch()
+            else:
+                lease.revoking = False  # already running there
+
+
+class RemoteBackend(ExecutionBackend):
+    """Runs tasks on the coordinator's workers; `local` still validates them"""
+
+    def __init__(self, coordinator: Coordinator, local: ExecutionBackend):
+        self.coordinator = coordinator
+        self.local = local
+        self.name = local.name
+
+    def validate(self, task):
+        self.local.validate(task)
+
+    async def run(self, task) -> Any:
+        return await self.coordinator.submit(task)
+
+    async def close(self):
+        await self.coordinator.close()
+
+
+class Worker:
+    """Connects to a coordinator and runs leased tasks, `slots` at a time, on local backends"""
+
+    def __init__(self, address: str, token: str, slots: int = 4, name: Optional[str] = None,
+                 output_dir: Optional[str] = None):
+        self.address = address
+        self.token = token.encode()
+        self.slots = slots
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.executor = ThreadPoolExecutor(max_workers=slots)
+        self.process_executor = ProcessPoolExecutor(max_workers=slots)
+        output = Path(output_dir or Path(tempfile.gettempdir()) / "hypervelocity-output" / self.name)
+        self.backends = {
+            "subprocess": SubprocessBackend(output),
+            "thread": ThreadBackend(self.executor),
+            "process": ProcessBackend(self.process_executor),
+        }
+        self.queue: Deque[Tuple[int, Any]] = deque()
+        self.running: Dict[int, asyncio.Task] = {}
+
+    async def run(self):
+        kind, where = parse_address(self.address)
+        if kind == "unix":
+            reader, writer = await asyncio.open_unix_connection(where)
+        else:
+            reader, writer = await asyncio.open_connection(*where)
+        await send_message(writer, self.token, {"type": "hello", "worker": self.name, "slots": self.slots})
+        welcome = await read_message(reader, self.token)
+        heartbeat = asyncio.create_task(self._heartbeat(writer, welcome["heartbeat"]))
+        logger.info(f"🤝 Worker {self.name} connected to {self.address}")
+        try:
+            while True:
+                message = await read_message(reader, self.token)
+                self._handle(writer, message)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.info("👋 Coordinator closed the connection")
+        finally:
+            heartbeat.cancel()
+            for job in list(self.running.values()):
+                job.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.process_executor.shutdown(wait=False, cancel_futures=True)
+            writer.close()
+
+    async def _heartbeat(self, writer: asyncio.StreamWriter, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await send_message(writer, self.token, {"type": "heartbeat"})
+
+    def _handle(self, writer: asyncio.StreamWriter, message: dict):
+        kind = message["type"]
+        if kind == "lease":
+            self.queue.append((message["lease"], message["task"]))
+        elif kind == "revoke":
+            entry = next((entry for entry in self.queue if entry[0] == message["lease"]), None)
+            if entry is not None:
+                self.queue.remove(entry)
+            asyncio.create_task(send_message(writer, self.token, {
+                "type": "revoked", "lease": message["lease"], "ok": entry is not None,
+            }))
+        elif kind == "cancel":
+            self.queue = deque(entry for entry in self.queue if entry[0] != message["lease"])
+            job = self.running.get(message["lease"])
+            if job is not None:
+                job.cancel()
+        self._start_queued(writer)
+
+    def _start_queued(self, writer: asyncio.StreamWriter):
+        while self.queue and len(self.running) < self.slots:
+            lease, task = self.queue.popleft()
+            self.running[lease] = asyncio.create_task(self._execute(writer, lease, task))
+
+    async def _execute(self, writer: asyncio.StreamWriter, lease: int, task):
+        try:
+            result = await self.backends[task.backend].run(task)
+            reply = {"type": "result", "lease": lease, "ok": True, "result": result}
+        except asyncio.CancelledError:
+            self.running.pop(lease, None)
+            raise
+        except Exception as e:
+            # Ship the exception itself so retry policies can match its class
+            try:
+                pickle.dumps(e)
+                error = e
+            except Exception:
+                error = TaskExecutionError(f"{type(e).__name__}: {e}")
+            reply = {"type": "result", "lease": lease, "ok": False, "error": error}
+        self.running.pop(lease, None)
+        try:
+            await send_message(writer, self.token, reply)
+        except Exception:
+            # Unpicklable result: report that instead of losing the lease
+            await send_message(writer, self.token, {
+                "type": "result", "lease": lease, "ok": False,
+                "error": TaskExecutionError(f"Result of {task.id} could not be sent back"),
+            })
+        self._start_queued(writer)
+
+
+async def demo(args):
+    """Coordinator plus local worker processes on a Unix socket, running a sleep DAG"""
+    from orchestrator import HypervelocityOrchestrator, Task
+
+    token = secrets.token_hex(16)
+    address = f"unix://{tempfile.gettempdir()}/hypervelocity-{os.getpid()}.sock"
+    coordinator = Coordinator(address, token, lease_ttl=args.lease_ttl)
+    await coordinator.start()
+    orchestrator = HypervelocityOrchestrator(max_workers=args.workers * args.slots * 4, coordinator=coordinator)
+
+    env = dict(os.environ, ORCHESTRATOR_CLUSTER_TOKEN=token)
+    workers = [
+        await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "worker", "--connect", address,
+            "--slots", str(args.slots), "--name", f"worker-{i}", env=env,
+        )
+        for i in range(args.workers)
+    ]
+    tasks = [
+        Task(f"t{i}", f"Task {i}", f"sleep {0.05 + (i % 7) * 0.02}",
+             [f"t{i - 1}"] if i % 5 else [])
+        for i in range(args.tasks)
+    ]
+
+    async def kill_one():
+        # Once it has done some work, so the kill lands mid-run
+        while coordinator.completed["worker-0"] < 20:
+            await asyncio.sleep(0.05)
+        workers[0].kill()
+        logger.warning("💀 Killed worker-0")
+
+    killer = asyncio.create_task(kill_one()) if args.kill_one else None
+    start = time.perf_counter()
+    completed = sum(1 for result in await orchestrator.run_parallel(tasks) if not isinstance(result, BaseException))
+    elapsed = time.perf_counter() - start
+    stats = coordinator.stats()
+    await orchestrator.shutdown()
+    for process in workers:
+        if process.returncode is None:
+            process.terminate()
+        await process.wait()
+    if killer is not None:
+        killer.cancel()
+
+    print(f"\n🌐 {completed}/{len(tasks)} tasks completed in {elapsed:.2f}s on {args.workers} workers")
+    print(f"Requeued: {stats['requeued']}  Stolen: {stats['stolen']}")
+    for name, completed in sorted(stats["completed"].items()):
+        print(f"  {name}: {completed} tasks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hypervelocity Orchestrator distributed worker')
+    sub = parser.add_subparsers(dest='command', required=True)
+    worker = sub.add_parser('worker', help='Run tasks leased by a coordinator')
+    worker.add_argument('--connect', required=True, help='tcp://host:port or unix:///path')
+    worker.add_argument('--slots', type=int, default=os.cpu_count() or 1, help='Tasks run at once')
+    worker.add_argument('--name', help='Worker name (default: host-pid)')
+    worker.add_argument('--output-dir', help='Where subprocess output is written')
+    demo_parser = sub.add_parser('demo', help='Coordinator and local worker processes on one machine')
+    demo_parser.add_argument('--workers', type=int, default=3)
+    demo_parser.add_argument('--slots', type=int, default=4)
+    demo_parser.add_argument('--tasks', type=int, default=300)
+    demo_parser.add_argument('--lease-ttl', type=float, default=3.0)
+    demo_parser.add_argument('--kill-one', action='store_true', help='Kill a worker mid-run to show requeueing')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'demo':
+        logging.getLogger('orchestrator').setLevel(logging.WARNING)
+        asyncio.run(demo(args))
+        return
+    token = os.getenv("ORCHESTRATOR_CLUSTER_TOKEN")
+    if not token:
+        parser.error("ORCHESTRATOR_CLUSTER_TOKEN must be set to the coordinator's token")
+    asyncio.run(Worker(args.connect, token, args.slots, args.name, args.output_dir).run())
+
+
+if __name__ == '__main__':
+    main()
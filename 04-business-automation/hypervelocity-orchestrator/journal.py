@@ -0,0 +1,145 @@
+"""
+📒 Crash-safe task journal for the Hypervelocity Orchestrator
+Task state changes are appended as JSON lines and fsynced in batches; replaying
+the journal restores where an interrupted run left off
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TaskJournal:
+    """Append-only journal of task state: status, result hash, error, retry count and fingerprint
+
+    `record` only buffers; a background flusher writes and fsyncs the buffer
+    every `flush_interval` seconds (or sooner once `flush_every` events are
+    pending), so durability costs one fsync per batch rather than per event.
+    Once the file holds `compact_every` superseded lines it is rewritten as one
+    line per task, so replay time tracks the number of tasks, not events.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.2, flush_every: int = 10000,
+                 compact_every: int = 500000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.compact_every = compact_every
+        # Latest state per task; entries are replaced, never mutated, so snapshots are cheap
+        self.state: Dict[str, dict] = {}
+        self._buffer: List[dict] = []
+        # Lines in the journal file, live or superseded
+        self._appended = 0
+        self._file = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._closing = False
+
+    def replay(self) -> Dict[str, dict]:
+        """Load the latest state of every task from disk"""
+        self.state = {}
+        self._appended = 0
+        if not os.path.exists(self.path):
+            return self.state
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write; everything before it stands
+                    logger.warning(f"⚠️  Ignoring corrupt journal line in {self.path}")
+                    continue
+                self.state[entry["id"]] = entry
+                self._appended += 1
+        return self.state
+
+    async def start(self):
+        """Open the journal for appending and start the background flusher"""
+        if self._flusher is not None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    def record(self, task):
+        entry = {
+            "id": task.id,
+            "status": task.status,
+            "result_hash": task.result_hash,
+            "error": task.error,
+            "retry_count": task.retry_count,
+            "fingerprint": task.fingerprint,
+        }
+        self.state[task.id] = entry
+        self._buffer.append(entry)
+        if len(self._buffer) >= self.flush_every and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _flush_loop(self):
+        # Only this loop writes while the journal is open, so batches never interleave
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write and fsync everything recorded so far; compact when due"""
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            await asyncio.to_thread(self._append, batch)
+            self._appended += len(batch)
+        if self._appended - len(self.state) >= self.compact_every:
+            await self.compact()
+
+    def _append(self, batch: List[dict]):
+        self._file.write(b"".join(json.dumps(entry).encode() + b"\n" for entry in batch))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def compact(self):
+        """Rewrite the journal as one line per task (write-then-rename, so a crash keeps the old file)"""
+        # Anything still buffered is in the snapshot too; appending it again later is harmless
+        snapshot = list(self.state.values())
+        await asyncio.to_thread(self._rewrite, snapshot)
+        self._appended = len(snapshot)
+        logger.info(f"📒 Compacted journal to {len(snapshot)} entries")
+
+    def _rewrite(self, snapshot: List[dict]):
+        tmp = f"{self.path}.compact"
+        with open(tmp, "wb") as f:
+            for start in range(0, len(snapshot), 10000):
+                f.write(b"".join(json.dumps(entry).encode() + b"\n" for entry in snapshot[start:start + 10000]))
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "ab")
+
+    def discard(self):
+        """Delete the journal of a finished run, so the next run starts fresh (call after close)"""
+        self.state = {}
+        self._appended = 0
+        for path in (self.path, f"{self.path}.compact"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    async def close(self):
+        """Stop the flusher after a final flush"""
+        if self._flusher is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._flusher
+        self._flusher = None
+        await self.flush()
+        self._file.close()
+        self._file = None
@@ -0,0 +1,165 @@
+"""
+📈 Live metrics for the Hypervelocity Orchestrator
+Counters updated on every task state change, per-kind latency histograms and
+worker / ready-queue gauges, exported through a Prometheus collector
+"""
+
+import bisect
+import os
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, generate_latest, start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+# Seconds; tasks range from sub-millisecond callables to long builds
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram; observe is one bisect and three additions"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(le, cumulative count) pairs, ending with +Inf"""
+        total = 0
+        buckets = []
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            total += count
+            buckets.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return buckets
+
+
+class OrchestratorMetrics:
+    """Everything get_metrics and /metrics report, maintained incrementally
+
+    The scheduler calls in on each state change, so reads are O(1) no matter
+    how many tasks there are. Worker and ready-queue figures are integrated
+    over time (busy worker-seconds, queued task-seconds) and also sampled
+    into a bounded `timeline` of (unix time, busy workers, ready tasks).
+    """
+
+    def __init__(self, max_workers: int, sample_interval: float = 1.0, timeline_size: int = 3600):
+        self.max_workers = max_workers
+        self.sample_interval = sample_interval
+        self.status: Counter = Counter()
+        self.queue_wait: Dict[str, LatencyHistogram] = {}
+        self.execution: Dict[str, LatencyHistogram] = {}
+        self.retries = 0
+        self.retries_denied = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time_saved = 0.0
+        self.busy = 0
+        self.ready = 0
+        self.max_ready = 0
+        self.busy_seconds = 0.0
+        self.ready_seconds = 0.0
+        self.elapsed = 0.0
+        self.timeline: Deque[Tuple[float, int, int]] = deque(maxlen=timeline_size)
+        self._last: Optional[float] = None
+        self._next_sample = 0.0
+        self.registry = CollectorRegistry()
+        self.registry.register(self)
+
+    def transition(self, old: Optional[str], new: Optional[str]):
+        """A task moved from status `old` to `new` (None: added / removed)"""
+        if old is not None:
+            self.status[old] -= 1
+        if new is not None:
+            self.status[new] += 1
+
+    def observe_task(self, kind: str, queue_wait: float, execution: float):
+        histogram = self.queue_wait.get(kind)
+        if histogram is None:
+            histogram = self.queue_wait[kind] = LatencyHistogram()
+            self.execution[kind] = LatencyHistogram()
+        histogram.observe(queue_wait)
+        self.execution[kind].observe(execution)
+
+    def observe_workers(self, busy: int, ready: int, now: float):
+        """Record the scheduler's worker and ready-queue state as of `now` (perf_counter)"""
+        if self._last is not None:
+            dt = now - self._last
+            self.busy_seconds += self.busy * dt
+            self.ready_seconds += self.ready * dt
+            self.elapsed += dt
+        self._last = now
+        self.busy = busy
+        self.ready = ready
+        if ready > self.max_ready:
+            self.max_ready = ready
+        if now >= self._next_sample:
+            self._next_sample = now + self.sample_interval
+            self.timeline.append((time.time(), busy, ready))
+
+    def run_finished(self, now: float):
+        """Close the run's integrals; idle time between runs is not counted"""
+        self.observe_workers(0, 0, now)
+        self._last = None
+
+    def utilisation(self) -> float:
+        """Busy worker-seconds over available worker-seconds, across runs"""
+        return self.busy_seconds / (self.elapsed * self.max_workers) if self.elapsed else 0.0
+
+    def average_ready(self) -> float:
+        return self.ready_seconds / self.elapsed if self.elapsed else 0.0
+
+    def collect(self) -> Iterator:
+        tasks = GaugeMetricFamily('orchestrator_tasks', 'Tasks by status', labels=['status'])
+        for status, count in list(self.status.items()):
+            tasks.add_metric([status], count)
+        yield tasks
+
+        for name, documentation, histograms in (
+            ('orchestrator_task_queue_wait_seconds', 'Time from ready (or due for retry) to started, by task kind', self.queue_wait),
+            ('orchestrator_task_execution_seconds', 'Duration of each attempt, by task kind', self.execution),
+        ):
+            family = HistogramMetricFamily(name, documentation, labels=['kind'])
+            for kind, histogram in list(histograms.items()):
+                family.add_metric([kind], histogram.cumulative(), histogram.sum)
+            yield family
+
+        yield GaugeMetricFamily('orchestrator_workers_busy', 'Tasks currently running', value=self.busy)
+        yield GaugeMetricFamily('orchestrator_workers_max', 'Configured max_workers', value=self.max_workers)
+        yield CounterMetricFamily('orchestrator_worker_busy_seconds', 'Busy worker-seconds', value=self.busy_seconds)
+        yield CounterMetricFamily('orchestrator_run_seconds', 'Seconds spent inside runs', value=self.elapsed)
+        yield GaugeMetricFamily('orchestrator_ready_queue_depth', 'Ready tasks waiting for a worker', value=self.ready)
+        yield GaugeMetricFamily('orchestrator_ready_queue_depth_max', 'Deepest the ready queue has been', value=self.max_ready)
+        yield CounterMetricFamily('orchestrator_task_retries', 'Task retries scheduled', value=self.retries)
+        yield CounterMetricFamily('orchestrator_task_retries_denied', 'Retries refused by the retry budget',
+                                  value=self.retries_denied)
+
+        cache = CounterMetricFamily('orchestrator_cache_lookups', 'Result cache lookups by result', labels=['result'])
+        cache.add_metric(['hit'], self.cache_hits)
+        cache.add_metric(['miss'], self.cache_misses)
+        yield cache
+        yield CounterMetricFamily('orchestrator_cache_saved_seconds', 'Execution time saved by cache hits',
+                                  value=self.cache_time_saved)
+
+    def render(self) -> bytes:
+        """Prometheus text exposition of the current values"""
+        return generate_latest(self.registry)
+
+    def write(self, path: str):
+        """Dump the text exposition to `path` (atomically, for node_exporter's textfile collector)"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port: int, addr: str = "0.0.0.0"):
+        """Serve /metrics from a background thread"""
+        start_http_server(port, addr, registry=self.registry)
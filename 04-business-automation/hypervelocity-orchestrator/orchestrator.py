@@ -7,18 +7,33 @@ Quality: Meta × Apple × Tesla level
 
 import asyncio
 import aiohttp
+import contextlib
+import heapq
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List, Dict, Any, Callable
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional, Sequence, Tuple
 from datetime import datetime
 import json
 import logging
+import os
+import tempfile
+import time
 from pathlib import Path
 
+from backends import ProcessBackend, SubprocessBackend, ThreadBackend
+from distributed import Coordinator, RemoteBackend
+from journal import TaskJournal
+from metrics import OrchestratorMetrics
+from retries import RetryBudget, RetryPolicy
+from scheduling import (DurationHistory, ReadyQueue, actual_critical_path,
+                        longest_remaining_paths, predicted_critical_path)
+from result_cache import FileHasher, ResultStore, Uncacheable, result_digest, task_key
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     id: str
     name: str
@@ -28,106 +43,562 @@ class Task:
     result: Any = None
     error: str = None
     retry_count: int = 0
+    # Attempts in all, first run included; retry_policy (if set) takes precedence
     max_retries: int = 3
+    retry_policy: Optional[RetryPolicy] = None
+    # "subprocess" runs `command`; "thread" / "process" call `func(*args)`
+    backend: str = "subprocess"
+    func: Optional[Callable] = None
+    args: tuple = ()
+    cwd: Optional[str] = None
+    timeout: Optional[float] = None
+    # Per-task limits (subprocess and process backends only)
+    cpu_seconds: Optional[int] = None
+    memory_mb: Optional[int] = None
+    # Files/directories the task reads; part of its cache key in incremental runs
+    inputs: Sequence[str] = ()
+    cacheable: bool = True
+    result_hash: Optional[str] = None
+    # What the task runs, on what, after what; journal entries only apply while it matches
+    fingerprint: Optional[str] = None
+    # Set by the scheduler (perf_counter seconds)
+    ready_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class DependencyError(ValueError):
+    """The task graph cannot be scheduled: unknown dependencies or a cycle"""
+
+class DependencyFailed(Exception):
+    """A task was skipped because one of its prerequisites failed"""
 
 class HypervelocityOrchestrator:
     """Ultra-fast parallel task orchestration with AI-powered auto-fixing"""
     
-    def __init__(self, max_workers: int = 50):
+    def __init__(self, max_workers: int = 50, process_workers: Optional[int] = None, output_dir: Optional[str] = None,
+                 cache_dir: Optional[str] = None, cache_max_bytes: int = 1024 * 1024 * 1024,
+                 history_file: Optional[str] = None, fairness_interval: int = 16,
+                 journal_file: Optional[str] = None, progress_interval: float = 5.0,
+                 retry_policy: Optional[RetryPolicy] = None, retry_budget: Optional[RetryBudget] = None,
+                 coordinator: Optional[Coordinator] = None):
+        # At most max_workers tasks run at once, whatever their backend
         self.max_workers = max_workers
         self.tasks: Dict[str, Task] = {}
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
-        self.process_executor = ProcessPoolExecutor(max_workers=10)
+        self.process_executor = ProcessPoolExecutor(max_workers=process_workers or os.cpu_count())
+        self.output_dir = Path(output_dir or Path(tempfile.gettempdir()) / "hypervelocity-output")
+        self.backends = {
+            "subprocess": SubprocessBackend(self.output_dir),
+            "thread": ThreadBackend(self.executor),
+            "process": ProcessBackend(self.process_executor),
+        }
+        # Distributed mode: tasks are leased to remote workers, which run them on the named backend
+        if coordinator is not None:
+            self.backends = {name: RemoteBackend(coordinator, backend) for name, backend in self.backends.items()}
+        # Incremental mode: with a cache_dir, tasks whose inputs are unchanged reuse stored results
+        self.result_cache = ResultStore(cache_dir, cache_max_bytes) if cache_dir else None
+        self.file_hasher = FileHasher()
+        # Ready tasks are dispatched longest-remaining-path first, from duration history
+        self.history = DurationHistory(history_file)
+        self.fairness_interval = fairness_interval
+        self.schedule_report: Dict[str, Any] = {}
+        # With a journal, an interrupted run resumes instead of starting over
+        self.journal = TaskJournal(journal_file) if journal_file else None
+        # Per-task events log at DEBUG; INFO gets a progress line every progress_interval seconds
+        self.progress_interval = progress_interval
+        # Counters kept current on every state change, so reading them is O(1)
+        self.metrics = OrchestratorMetrics(max_workers)
+        # Failed tasks go back to the scheduler on a timer; the budget caps retries across all tasks
+        self.retry_policy = retry_policy
+        self.retry_budget = retry_budget or RetryBudget()
+        self._default_policies: Dict[int, RetryPolicy] = {}
         
     async def add_task(self, task: Task):
         """Add task to orchestration queue"""
-        self.tasks[task.id] = task
-        logger.info(f"✅ Task added: {task.name}")
+        self._register(task)
+        logger.debug(f"✅ Task added: {task.name}")
         
     async def execute_task(self, task: Task) -> Any:
-        """Execute single task with retry logic"""
+        """Run one attempt of a task; on failure the scheduler decides whether to retry"""
         try:
-            task.status = "running"
-            logger.info(f"🚀 Executing: {task.name}")
+            self._set_status(task, "running")
+            cache_key = await self._cache_key(task)
+            if cache_key is not None:
+                record = self.result_cache.get(cache_key)
+                if record is not None:
+                    self.metrics.cache_hits += 1
+                    self.metrics.cache_time_saved += record["duration"]
+                    task.result, task.result_hash = record["result"], record["result_hash"]
+                    self._set_status(task, "completed")
+                    logger.debug(f"♻️  Cached: {task.name}")
+                    return task.result
+                self.metrics.cache_misses += 1
             
-            # Simulate task execution
-            await asyncio.sleep(0.1)  # Ultra-fast execution
+            logger.debug(f"🚀 Executing: {task.name}")
+            start = time.perf_counter()
+            task.result = await self.backends[task.backend].run(task)
+            duration = time.perf_counter() - start
+            self.history.record(task, duration)
             
-            task.status = "completed"
-            task.result = {"success": True, "data": f"Result for {task.name}"}
-            logger.info(f"✅ Completed: {task.name}")
+            if self.result_cache is not None or self.journal is not None:
+                self._store_result(task, cache_key, duration)
+            self._set_status(task, "completed")
+            logger.debug(f"✅ Completed: {task.name}")
             return task.result
             
         except Exception as e:
             task.error = str(e)
             task.retry_count += 1
-            
-            if task.retry_count < task.max_retries:
-                logger.warning(f"⚠️  Retry {task.retry_count}/{task.max_retries}: {task.name}")
-                await self.auto_fix_and_retry(task)
-            else:
-                task.status = "failed"
-                logger.error(f"❌ Failed: {task.name} - {e}")
-                raise
+            self._set_status(task, "failed")
+            raise
                 
-    async def auto_fix_and_retry(self, task: Task):
-        """AI-powered automatic error fixing"""
+    async def _cache_key(self, task: Task) -> Optional[str]:
+        """Content address of the task, or None when it cannot be cached"""
+        if self.result_cache is None or not task.cacheable:
+            return None
+        dependency_hashes = []
+        for dep in task.dependencies:
+            # A dependency with an unhashable result makes the task's inputs unknowable
+            dependency_hash = self.tasks[dep].result_hash if dep in self.tasks else None
+            if dependency_hash is None:
+                return None
+            dependency_hashes.append(dependency_hash)
+        try:
+            if task.inputs:
+                # Hashing input files is blocking I/O
+                return await asyncio.to_thread(task_key, task, dependency_hashes, self.file_hasher)
+            return task_key(task, dependency_hashes, self.file_hasher)
+        except Uncacheable as e:
+            logger.debug(f"Not caching {task.id}: {e}")
+            return None
+        
+    def _store_result(self, task: Task, cache_key: Optional[str], duration: float):
+        try:
+            task.result_hash = result_digest(task.result)
+        except Uncacheable:
+            task.result_hash = None
+            return
+        if cache_key is not None:
+            self.result_cache.put(cache_key, task.result, task.result_hash, duration)
+        
+    async def auto_fix(self, task: Task):
+        """AI-powered automatic error fixing, before a retry attempt"""
         logger.info(f"🔧 Auto-fixing: {task.name}")
         # AI analysis and fix would go here
-        await asyncio.sleep(0.05)
-        await self.execute_task(task)
         
-    async def run_parallel(self, tasks: List[Task]):
-        """Execute multiple tasks in parallel with dependency resolution"""
+    def _retry_policy(self, task: Task) -> RetryPolicy:
+        if task.retry_policy is not None:
+            return task.retry_policy
+        if self.retry_policy is not None:
+            return self.retry_policy
+        policy = self._default_policies.get(task.max_retries)
+        if policy is None:
+            policy = self._default_policies[task.max_retries] = RetryPolicy(max_attempts=task.max_retries)
+        return policy
+        
+    def _retry_delay(self, task: Task, error: Exception) -> Optional[float]:
+        """Seconds until the failed task's next attempt, or None if it has failed for good"""
+        policy = self._retry_policy(task)
+        if not policy.should_retry(error, task.retry_count):
+            return None
+        if not self.retry_budget.withdraw():
+            self.metrics.retries_denied += 1
+            task.error = f"{task.error} (retry budget exhausted)"
+            return None
+        return policy.delay(task.retry_count)
+        
+    async def run_parallel(self, tasks: List[Task]) -> List[Any]:
+        """Execute multiple tasks in parallel with dependency resolution
+        
+        Returns every result (exceptions for failed and skipped tasks) in
+        completion order; for large DAGs prefer iter_results.
+        """
+        return [result async for _, result in self.iter_results(tasks, keep_results=True)]
+        
+    async def iter_results(self, tasks: List[Task], keep_results: bool = False) -> AsyncIterator[Tuple[str, Any]]:
+        """Run tasks like run_parallel, yielding (task_id, result) as each one finishes
+        
+        Failed tasks yield their exception and skipped ones DependencyFailed.
+        Unless keep_results is set, a task's result is dropped once yielded,
+        so memory does not grow with the number of finished tasks. Exhaust
+        the iterator or close it (contextlib.aclosing): closing it early
+        cancels the tasks still running.
+        """
         logger.info(f"🎯 Starting {len(tasks)} tasks in parallel...")
         start_time = datetime.now()
         
-        # Build dependency graph
-        dependency_graph = self._build_dependency_graph(tasks)
+        for task in tasks:
+            if task.id not in self.tasks:
+                self._register(task)
+            backend = self.backends.get(task.backend)
+            if backend is None:
+                raise ValueError(f"Task {task.id}: unknown backend '{task.backend}'")
+            backend.validate(task)
+        
+        # Resuming: tasks the journal saw complete are not run again
+        pending = self._resume(tasks) if self.journal is not None else tasks
+        
+        # Build and validate the dependency graph before anything runs
+        dependency_graph = self._build_dependency_graph(pending)
         
         # Execute tasks respecting dependencies
-        results = await self._execute_with_dependencies(dependency_graph)
+        if self.journal is not None:
+            await self.journal.start()
+        try:
+            async with contextlib.aclosing(self._execute_with_dependencies(dependency_graph)) as results:
+                async for task_id, result in results:
+                    if not keep_results:
+                        self.tasks[task_id].result = None
+                    yield task_id, result
+        finally:
+            if self.journal is not None:
+                await self.journal.close()
+        # A run that finished with every task completed has nothing left to resume
+        if self.journal is not None and all(task.status == "completed" for task in tasks):
+            self.journal.discard()
+        self.history.save()
         
         duration = (datetime.now() - start_time).total_seconds()
         logger.info(f"⚡ Completed {len(tasks)} tasks in {duration:.2f}s")
         logger.info(f"🚀 Speed: {len(tasks)/duration:.1f} tasks/second")
+        self._log_critical_path()
         
-        return results
+    def _resume(self, tasks: List[Task]) -> List[Task]:
+        """Apply journaled state; returns the tasks that still have to run
+        
+        Completed tasks keep their result hash (results themselves are not
+        journaled; with a cache_dir they are in the result cache). Tasks that
+        were running when the previous process died are simply rescheduled.
+        Entries whose fingerprint no longer matches the task (its command,
+        inputs or any upstream task changed) are ignored.
+        """
+        self._fingerprint(tasks)
+        state = self.journal.replay()
+        pending = []
+        interrupted = 0
+        changed = 0
+        for task in tasks:
+            entry = state.get(task.id)
+            if entry is None or task.fingerprint is None or entry.get("fingerprint") != task.fingerprint:
+                changed += entry is not None
+                pending.append(task)
+                continue
+            if entry["status"] == "completed":
+                self.metrics.transition(task.status, "completed")
+                task.status = "completed"
+                task.result_hash = entry["result_hash"]
+                task.retry_count = entry["retry_count"]
+                continue
+            if entry["status"] in ("running", "retrying"):
+                # Retries already spent before the crash still count
+                task.retry_count = entry["retry_count"]
+                interrupted += 1
+            self.metrics.transition(task.status, "pending")
+            task.status = "pending"
+            pending.append(task)
+        if len(pending) < len(tasks) or interrupted or changed:
+            logger.info(f"📒 Resuming: {len(tasks) - len(pending)} completed tasks skipped, "
+                        f"{interrupted} interrupted tasks rescheduled, {changed} changed tasks rerun")
+        return pending
+        
+    def _fingerprint(self, tasks: List[Task]):
+        """Set task.fingerprint: the task's cache key over its dependencies' fingerprints
+        
+        A task whose spec cannot be hashed (or that sits on a cycle, which
+        graph validation rejects anyway) gets None and never matches.
+        """
+        fingerprints: Dict[str, Optional[str]] = {}
+        expanding = set()
+        for root in tasks:
+            stack = [(root, False)]
+            while stack:
+                task, expanded = stack.pop()
+                if task.id in fingerprints:
+                    continue
+                if not expanded:
+                    expanding.add(task.id)
+                    stack.append((task, True))
+                    stack.extend((self.tasks[dep], False) for dep in task.dependencies
+                                 if dep in self.tasks and dep not in fingerprints and dep not in expanding)
+                    continue
+                dependency_fingerprints = [fingerprints.get(dep) for dep in task.dependencies]
+                try:
+                    fingerprint = (task_key(task, dependency_fingerprints, self.file_hasher)
+                                   if None not in dependency_fingerprints else None)
+                except Uncacheable:
+                    fingerprint = None
+                fingerprints[task.id] = task.fingerprint = fingerprint
+        
+    def _register(self, task: Task):
+        previous = self.tasks.get(task.id)
+        if previous is not None:
+            self.metrics.transition(previous.status, None)
+        self.tasks[task.id] = task
+        self.metrics.transition(None, task.status)
+        
+    def _set_status(self, task: Task, status: str):
+        """Every status change goes through here: counters and journal stay in step"""
+        self.metrics.transition(task.status, status)
+        task.status = status
+        self._record(task)
+        
+    def _record(self, task: Task):
+        if self.journal is not None:
+            self.journal.record(task)
         
     def _build_dependency_graph(self, tasks: List[Task]) -> Dict[str, List[str]]:
-        """Build task dependency graph"""
-        graph = {}
+        """Build task dependency graph; raises DependencyError for unknown deps or cycles"""
+        graph = dict.fromkeys((task.id for task in tasks), ())
+        missing = []
         for task in tasks:
-            graph[task.id] = task.dependencies
+            if all(dep in graph for dep in task.dependencies):
+                # The common case shares the task's own list instead of copying it
+                graph[task.id] = task.dependencies
+                continue
+            deps = graph[task.id] = []
+            for dep in task.dependencies:
+                if dep in graph:
+                    deps.append(dep)
+                elif dep in self.tasks and self.tasks[dep].status == "completed":
+                    continue  # finished in an earlier run
+                else:
+                    missing.append(f"{task.id} -> {dep}")
+        if missing:
+            raise DependencyError(f"Unknown dependencies: {', '.join(missing[:10])}"
+                                  + (f" (+{len(missing) - 10} more)" if len(missing) > 10 else ""))
+        self._check_acyclic(graph)
         return graph
         
-    async def _execute_with_dependencies(self, graph: Dict[str, List[str]]) -> List[Any]:
-        """Execute tasks respecting dependency order"""
-        executed = set()
-        results = []
-        
-        while len(executed) < len(graph):
-            # Find tasks with satisfied dependencies
-            ready_tasks = [
-                task_id for task_id in graph
-                if task_id not in executed and
-                all(dep in executed for dep in graph[task_id])
-            ]
-            
-            if not ready_tasks:
-                break
+    def _check_acyclic(self, graph: Dict[str, List[str]]):
+        """Kahn's algorithm in O(V + E); on leftovers, report one cycle"""
+        in_degree = {task_id: len(deps) for task_id, deps in graph.items()}
+        dependents = self._dependents(graph)
+        queue = deque(task_id for task_id, degree in in_degree.items() if degree == 0)
+        visited = 0
+        while queue:
+            task_id = queue.popleft()
+            visited += 1
+            for child in dependents[task_id]:
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    queue.append(child)
+        if visited == len(graph):
+            return
+        
+        # Every leftover task has a leftover dependency, so walking them must loop
+        task_id = next(task_id for task_id, degree in in_degree.items() if degree > 0)
+        path, seen = [], {}
+        while task_id not in seen:
+            seen[task_id] = len(path)
+            path.append(task_id)
+            task_id = next(dep for dep in graph[task_id] if in_degree[dep] > 0)
+        cycle = path[seen[task_id]:] + [task_id]
+        raise DependencyError(f"Dependency cycle (task -> dependency): {' -> '.join(cycle)}")
+        
+    @staticmethod
+    def _dependents(graph: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        # Tasks nothing depends on share one empty tuple rather than each holding a list
+        dependents = dict.fromkeys(graph, ())
+        for task_id, deps in graph.items():
+            for dep in deps:
+                children = dependents[dep]
+                if children:
+                    children.append(task_id)
+                else:
+                    dependents[dep] = [task_id]
+        return dependents
+        
+    async def _execute_with_dependencies(self, graph: Dict[str, List[str]]) -> AsyncIterator[Tuple[str, Any]]:
+        """Execute tasks respecting dependency order, yielding (task_id, result)
+        
+        Event-driven: each task starts as soon as its last prerequisite
+        completes (in-degree counters + ready queue), so there are no waves
+        and each completion costs O(out-degree). Results come in completion
+        order; dependents of a failed task are skipped with DependencyFailed.
+        
+        When more tasks are ready than workers are free, the one with the
+        longest estimated remaining path through the DAG goes first.
+        
+        A failed attempt frees its worker at once; if the task's retry policy
+        and the retry budget allow, it waits in a timer heap until its backoff
+        has elapsed and then rejoins the ready queue.
+        """
+        in_degree = {task_id: len(deps) for task_id, deps in graph.items()}
+        dependents = self._dependents(graph)
+        tasks = self.tasks
+        fallback = self.history.fallback()
+        priorities = longest_remaining_paths(
+            graph, dependents, lambda task_id: self.history.estimate(tasks[task_id], fallback)
+        )
+        ready = ReadyQueue(self.fairness_interval)
+        self.retry_budget.start_run()
+        run_start = time.perf_counter()
+        for task_id, degree in in_degree.items():
+            if degree == 0:
+                tasks[task_id].ready_at = run_start
+                ready.push(task_id, priorities[task_id])
+        metrics = self.metrics
+        loop = asyncio.get_running_loop()
+        finished: asyncio.Queue = asyncio.Queue()
+        # (due, seq, task_id) in loop time; one wakeup is armed for the earliest entry
+        timers: List[Tuple[float, int, str]] = []
+        timer_seq = 0
+        wakeup = None
+        running = set()  # references, so workers are not garbage collected
+        active = 0
+        skipped = set()
+        remaining = len(graph)
+        done = 0
+        next_progress = run_start + self.progress_interval
+        
+        async def run(task: Task):
+            task.started_at = time.perf_counter()
+            try:
+                if task.status == "retrying":
+                    await self.auto_fix(task)
+                result = await self.execute_task(task)
+            except asyncio.CancelledError:
+                # Iterator closed early: the task never finished
+                self._set_status(task, "pending")
+                raise
+            except Exception as e:
+                result = e
+            finished.put_nowait((task, result))
+        
+        try:
+            while remaining:
+                # max_workers is the real bound: the rest wait in the ready queue
+                while ready and active < self.max_workers:
+                    worker = asyncio.create_task(run(tasks[ready.pop()]))
+                    running.add(worker)
+                    worker.add_done_callback(running.discard)
+                    active += 1
+                metrics.observe_workers(active, len(ready), time.perf_counter())
                 
-            # Execute ready tasks in parallel
-            task_objects = [self.tasks[tid] for tid in ready_tasks]
-            batch_results = await asyncio.gather(
-                *[self.execute_task(task) for task in task_objects],
-                return_exceptions=True
-            )
-            
-            results.extend(batch_results)
-            executed.update(ready_tasks)
+                task, result = await finished.get()
+                if task is None:
+                    # A retry timer is due
+                    wakeup = None
+                    now = time.perf_counter()
+                    while timers and timers[0][0] <= loop.time():
+                        task_id = heapq.heappop(timers)[2]
+                        tasks[task_id].ready_at = now
+                        ready.push(task_id, priorities[task_id])
+                    if timers:
+                        wakeup = loop.call_at(timers[0][0], finished.put_nowait, (None, None))
+                    continue
+                
+                task.finished_at = now = time.perf_counter()
+                active -= 1
+                metrics.observe_task(task.backend, task.started_at - task.ready_at, now - task.started_at)
+                
+                if isinstance(result, Exception):
+                    delay = self._retry_delay(task, result)
+                    if delay is not None:
+                        self._set_status(task, "retrying")
+                        metrics.retries += 1
+                        policy = self._retry_policy(task)
+                        logger.warning(f"⚠️  Retry {task.retry_count}/{policy.max_attempts - 1} in {delay:.2f}s: "
+                                       f"{task.name} - {task.error}")
+                        due = loop.time() + delay
+                        timer_seq += 1
+                        heapq.heappush(timers, (due, timer_seq, task.id))
+                        if timers[0][1] == timer_seq:
+                            # New earliest entry: re-arm the wakeup for it
+                            if wakeup is not None:
+                                wakeup.cancel()
+                            wakeup = loop.call_at(due, finished.put_nowait, (None, None))
+                        continue
+                    logger.error(f"❌ Failed: {task.name} - {task.error}")
+                else:
+                    self.retry_budget.record_completed()
+                
+                remaining -= 1
+                done += 1
+                if now >= next_progress:
+                    next_progress = now + self.progress_interval
+                    logger.info(f"📊 Progress: {done}/{len(graph)} finished, {active} running, {len(ready)} ready")
+                
+                # Release dependents before yielding, so a slow consumer does not stall dispatch
+                if not isinstance(result, BaseException):
+                    for child in dependents[task.id]:
+                        in_degree[child] -= 1
+                        if in_degree[child] == 0:
+                            tasks[child].ready_at = now
+                            ready.push(child, priorities[child])
+                    yield task.id, result
+                    continue
+                
+                # Skip everything downstream of the failure
+                newly_skipped = []
+                stack = list(dependents[task.id])
+                while stack:
+                    child = tasks[stack.pop()]
+                    if child.id in skipped:
+                        continue
+                    skipped.add(child.id)
+                    child.error = f"dependency failed: {task.id}"
+                    self._set_status(child, "skipped")
+                    newly_skipped.append(child)
+                    stack.extend(dependents[child.id])
+                remaining -= len(newly_skipped)
+                done += len(newly_skipped)
+                yield task.id, result
+                for child in newly_skipped:
+                    yield child.id, DependencyFailed(child.error)
+        finally:
+            # Closed early: stop whatever is still running
+            if wakeup is not None:
+                wakeup.cancel()
+            for worker in list(running):
+                worker.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            metrics.run_finished(time.perf_counter())
             
-        return results
+        self.schedule_report = self._schedule_report(graph, dependents, priorities, run_start)
+        
+    def _schedule_report(self, graph, dependents, priorities, run_start) -> Dict[str, Any]:
+        """Predicted vs actual critical path of the last run"""
+        tasks = self.tasks
+        predicted = predicted_critical_path(graph, dependents, priorities)
+        actual = actual_critical_path(graph, lambda task_id: tasks[task_id].finished_at)
+        predicted_set = set(predicted)
+        finished = [tasks[task_id].finished_at for task_id in graph if tasks[task_id].finished_at is not None]
+        durations = {task_id: tasks[task_id].finished_at - tasks[task_id].started_at for task_id in actual}
+        return {
+            "makespan_seconds": (max(finished) - run_start) if finished else 0.0,
+            "predicted_critical_path": {
+                "tasks": predicted,
+                "estimated_seconds": priorities[predicted[0]] if predicted else 0.0,
+            },
+            "actual_critical_path": {
+                "tasks": actual,
+                "seconds": sum(durations.values()),
+                "durations": durations,
+            },
+            # Share of the actual critical path the prediction got right
+            "overlap": (sum(1 for task_id in actual if task_id in predicted_set) / len(actual)) if actual else 0.0,
+        }
+        
+    def _log_critical_path(self):
+        report = self.schedule_report
+        if not report:
+            return
+        def chain(tasks: List[str]) -> str:
+            return " → ".join(tasks) if len(tasks) <= 6 else " → ".join(tasks[:3] + ["…"] + tasks[-2:])
+        predicted, actual = report["predicted_critical_path"], report["actual_critical_path"]
+        logger.info(f"🧭 Predicted critical path ({predicted['estimated_seconds']:.2f}s, "
+                    f"{len(predicted['tasks'])} tasks): {chain(predicted['tasks'])}")
+        logger.info(f"🧭 Actual critical path ({actual['seconds']:.2f}s of {report['makespan_seconds']:.2f}s makespan, "
+                    f"{len(actual['tasks'])} tasks, {report['overlap']:.0%} predicted): {chain(actual['tasks'])}")
+        
+    async def shutdown(self):
+        """Release the worker pools"""
+        for backend in self.backends.values():
+            await backend.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.process_executor.shutdown(wait=False, cancel_futures=True)
         
     async def deploy_to_github(self, repo: str, branch: str, files: Dict[str, str]):
         """Automated GitHub deployment"""
@@ -137,31 +608,47 @@ class HypervelocityOrchestrator:
         logger.info(f"✅ Deployed to GitHub")
         
     def get_metrics(self) -> Dict[str, Any]:
-        """Get orchestration metrics"""
+        """Get orchestration metrics (O(1): read from incrementally kept counters)"""
+        metrics = self.metrics
         total = len(self.tasks)
-        completed = sum(1 for t in self.tasks.values() if t.status == "completed")
-        failed = sum(1 for t in self.tasks.values() if t.status == "failed")
-        running = sum(1 for t in self.tasks.values() if t.status == "running")
+        completed = metrics.status["completed"]
         
         return {
             "total_tasks": total,
             "completed": completed,
-            "failed": failed,
-            "running": running,
+            "failed": metrics.status["failed"],
+            "running": metrics.status["running"],
+            "skipped": metrics.status["skipped"],
+            "pending": metrics.status["pending"],
             "success_rate": (completed / total * 100) if total > 0 else 0,
-            "parallel_workers": self.max_workers
+            "parallel_workers": self.max_workers,
+            "workers_busy": metrics.busy,
+            "worker_utilisation": round(metrics.utilisation(), 4),
+            "ready_queue_depth": metrics.ready,
+            "ready_queue_depth_avg": round(metrics.average_ready(), 2),
+            "ready_queue_depth_max": metrics.max_ready,
+            "retries": metrics.retries,
+            "retries_denied": metrics.retries_denied,
+            "cache_hits": metrics.cache_hits,
+            "cache_misses": metrics.cache_misses,
+            "cache_time_saved_seconds": round(metrics.cache_time_saved, 3),
+            "cache_entries": len(self.result_cache) if self.result_cache is not None else 0,
+            "cache_bytes": self.result_cache.current_bytes if self.result_cache is not None else 0
         }
 
 async def main():
     """Demo: 50x parallel execution"""
-    orchestrator = HypervelocityOrchestrator(max_workers=50)
+    orchestrator = HypervelocityOrchestrator(max_workers=50, cache_dir=os.getenv("ORCHESTRATOR_CACHE_DIR"),
+                                             journal_file=os.getenv("ORCHESTRATOR_JOURNAL"))
+    if os.getenv("ORCHESTRATOR_METRICS_PORT"):
+        orchestrator.metrics.serve(int(os.getenv("ORCHESTRATOR_METRICS_PORT")))
     
     # Create 100 demo tasks
     tasks = [
         Task(
             id=f"task-{i}",
             name=f"Build Component {i}",
-            command=f"build-{i}",
+            command=f"echo 'Building component {i}'",
             dependencies=[f"task-{i-1}"] if i > 0 and i % 10 == 0 else []
         )
         for i in range(100)
@@ -172,6 +659,7 @@ async def main():
     
     # Execute all tasks in parallel
     results = await orchestrator.run_parallel(tasks)
+    await orchestrator.shutdown()
     
     # Show metrics
     metrics = orchestrator.get_metrics()
@@ -182,8 +670,12 @@ async def main():
     print(f"Completed: {metrics['completed']}")
     print(f"Failed: {metrics['failed']}")
     print(f"Success Rate: {metrics['success_rate']:.1f}%")
-    print(f"Parallel Workers: {metrics['parallel_workers']}")
+    print(f"Parallel Workers: {metrics['parallel_workers']} ({metrics['worker_utilisation']:.0%} utilised)")
+    if orchestrator.result_cache is not None:
+        print(f"Cache Hits: {metrics['cache_hits']} (saved {metrics['cache_time_saved_seconds']:.2f}s)")
     print("="*60)
+    if os.getenv("ORCHESTRATOR_METRICS_FILE"):
+        orchestrator.metrics.write(os.getenv("ORCHESTRATOR_METRICS_FILE"))
 
 if __name__ == "__main__":
     asyncio.run(main())
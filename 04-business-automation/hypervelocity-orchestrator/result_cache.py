@@ -0,0 +1,153 @@
+"""
+🗄️ Content-addressed result store for incremental orchestrator runs
+A task's key hashes its command (or callable and arguments), its declared input
+files and its dependencies' result hashes; results live on disk under that key
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Result fields that differ between otherwise identical runs
+VOLATILE_RESULT_KEYS = frozenset({"duration", "stdout_path", "stderr_path"})
+
+
+class Uncacheable(Exception):
+    """The task's inputs cannot be hashed (unpicklable args, unhashed dependency)"""
+
+
+def result_digest(result: Any) -> str:
+    """Stable hash of a task result, ignoring per-run fields such as timings"""
+    if isinstance(result, dict):
+        result = {key: value for key, value in result.items() if key not in VOLATILE_RESULT_KEYS}
+    try:
+        return hashlib.sha256(pickle.dumps(result, protocol=4)).hexdigest()
+    except Exception as e:
+        raise Uncacheable(f"result cannot be hashed: {e}")
+
+
+class FileHasher:
+    """sha256 of input files, memoised on (path, mtime, size) so unchanged files are read once"""
+
+    def __init__(self):
+        self._memo: Dict[str, Tuple[int, int, str]] = {}
+
+    def _file(self, path: str) -> str:
+        st = os.stat(path)
+        memo = self._memo.get(path)
+        if memo is not None and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+            return memo[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        self._memo[path] = (st.st_mtime_ns, st.st_size, digest.hexdigest())
+        return digest.hexdigest()
+
+    def digest(self, path: str) -> str:
+        """A file's hash, or a directory's (hash of its files' relative paths and hashes)"""
+        if not os.path.isdir(path):
+            return self._file(path)
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                digest.update(os.path.relpath(full, path).encode() + b"\0" + self._file(full).encode())
+        return digest.hexdigest()
+
+
+def task_key(task, dependency_hashes: Iterable[str], hasher: FileHasher) -> str:
+    """Content address of a task: what it runs, on what, after what"""
+    digest = hashlib.sha256()
+    digest.update(f"{task.backend}\0{task.command}\0{task.cwd}\0".encode())
+    if task.func is not None:
+        digest.update(f"{task.func.__module__}.{task.func.__qualname__}\0".encode())
+        try:
+            digest.update(pickle.dumps(task.args, protocol=4))
+        except Exception as e:
+            raise Uncacheable(f"args cannot be hashed: {e}")
+    for path in sorted(task.inputs):
+        try:
+            digest.update(f"{path}\0{hasher.digest(path)}\0".encode())
+        except OSError as e:
+            raise Uncacheable(f"input {path} unreadable: {e}")
+    for dependency_hash in dependency_hashes:
+        digest.update(dependency_hash.encode())
+    return digest.hexdigest()
+
+
+class ResultStore:
+    """On-disk result cache under `root`, one file per key, LRU-evicted beyond `max_bytes`
+
+    Recency is the file's mtime (touched on every hit), so LRU order survives
+    restarts; the in-memory index is rebuilt from a directory scan.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(".pkl"):
+                st = entry.stat()
+                entries.append((st.st_mtime_ns, entry.name[:-4], st.st_size))
+        # key -> size, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict(
+            (key, size) for _, key, size in sorted(entries)
+        )
+        self.current_bytes = sum(self._index.values())
+        self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.pkl"
+
+    def get(self, key: str) -> Optional[dict]:
+        """The stored {'result', 'result_hash', 'duration'} record, or None"""
+        if key not in self._index:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                record = pickle.load(f)
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self._drop(key)
+            return None
+        self._index.move_to_end(key)
+        return record
+
+    def put(self, key: str, result: Any, result_hash: str, duration: float):
+        try:
+            data = pickle.dumps({"result": result, "result_hash": result_hash, "duration": duration}, protocol=4)
+        except Exception:
+            return  # unpicklable result: simply not cached
+        if len(data) > self.max_bytes:
+            return
+        # Write-then-rename so a crash never leaves a truncated entry
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+        self.current_bytes += len(data) - self._index.pop(key, 0)
+        self._index[key] = len(data)
+        self._evict()
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self._index:
+            self._drop(next(iter(self._index)))
+
+    def _drop(self, key: str):
+        self.current_bytes -= self._index.pop(key, 0)
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def __len__(self) -> int:
+        return len(self._index)
@@ -0,0 +1,60 @@
+"""
+🔁 Retry policy for the Hypervelocity Orchestrator
+Per-task retry policies with jittered exponential backoff, and a per-run retry
+budget so a failing dependency cannot flood the workers with retries
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Tuple, Type
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """When and how soon a failed task runs again
+
+    `max_attempts` counts the first run. An error is retried when it is an
+    instance of `retry_on` and not of `give_up_on`; the delay before retry
+    number n is drawn uniformly from [0, min(max_backoff, backoff * 2**(n-1))].
+    """
+
+    max_attempts: int = 3
+    backoff: float = 0.05
+    max_backoff: float = 30.0
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,)
+    give_up_on: Tuple[Type[BaseException], ...] = ()
+
+    def should_retry(self, error: BaseException, attempts: int) -> bool:
+        return (
+            attempts < self.max_attempts
+            and isinstance(error, self.retry_on)
+            and not isinstance(error, self.give_up_on)
+        )
+
+    def delay(self, retry: int) -> float:
+        """Full-jitter backoff for retry number `retry` (1-based)"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (retry - 1)))
+
+
+class RetryBudget:
+    """Retries allowed in a run: `minimum`, plus `ratio` per task completed so far"""
+
+    def __init__(self, ratio: float = 0.2, minimum: int = 10):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.completed = 0
+        self.retries = 0
+
+    def start_run(self):
+        self.completed = 0
+        self.retries = 0
+
+    def record_completed(self):
+        self.completed += 1
+
+    def withdraw(self) -> bool:
+        """Take one retry from the budget; False when it is spent"""
+        if self.retries >= self.minimum + self.ratio * self.completed:
+            return False
+        self.retries += 1
+        return True
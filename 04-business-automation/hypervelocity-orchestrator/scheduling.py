@@ -0,0 +1,184 @@
+"""
+🧭 Critical-path scheduling for the Hypervelocity Orchestrator
+Duration history, longest-remaining-path priorities and a priority ready queue
+with a fairness guard
+"""
+
+import heapq
+import json
+import os
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def history_keys(task) -> Tuple[str, str]:
+    """(id key, command key) a task's durations are recorded under"""
+    if task.func is not None:
+        command = f"{task.func.__module__}.{task.func.__qualname__}"
+    else:
+        command = task.command
+    return f"id:{task.id}", f"cmd:{task.backend}:{command}"
+
+
+class DurationHistory:
+    """Exponentially weighted task durations, by task id and by command
+
+    Estimates prefer the task's own history, then that of any task running
+    the same command, then the mean of everything seen (or `default`).
+    Optionally persisted as JSON at `path` so estimates carry across runs.
+    Per-id history stops growing at `max_entries`; beyond that, new task
+    ids are estimated from their command alone.
+    """
+
+    def __init__(self, path: Optional[str] = None, alpha: float = 0.3, default: float = 1.0,
+                 max_entries: int = 100000):
+        self.path = path
+        self.alpha = alpha
+        self.default = default
+        self.max_entries = max_entries
+        self.durations: Dict[str, float] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.durations = {key: float(value) for key, value in json.load(f).items()}
+            except (OSError, ValueError, AttributeError):
+                self.durations = {}
+
+    def record(self, task, duration: float):
+        id_key, command_key = history_keys(task)
+        for key in (id_key, command_key):
+            previous = self.durations.get(key)
+            if previous is not None:
+                self.durations[key] = previous + self.alpha * (duration - previous)
+            elif key is command_key or len(self.durations) < self.max_entries:
+                self.durations[key] = duration
+
+    def fallback(self) -> float:
+        """Estimate for tasks nothing is known about"""
+        if not self.durations:
+            return self.default
+        return sum(self.durations.values()) / len(self.durations)
+
+    def estimate(self, task, fallback: Optional[float] = None) -> float:
+        id_key, command_key = history_keys(task)
+        duration = self.durations.get(id_key)
+        if duration is None:
+            duration = self.durations.get(command_key)
+        if duration is None:
+            duration = self.fallback() if fallback is None else fallback
+        return duration
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.durations, f)
+        os.replace(tmp, self.path)
+
+
+def longest_remaining_paths(graph: Dict[str, List[str]], dependents: Dict[str, List[str]],
+                            estimate: Callable[[str], float]) -> Dict[str, float]:
+    """For each task, estimated time from its start to the end of its longest downstream chain
+
+    Tasks are visited sinks-first (Kahn's algorithm on the reversed graph), so
+    this is O(V + E); the graph must already be known to be acyclic.
+    """
+    pending = {task_id: len(children) for task_id, children in dependents.items()}
+    # Until a task is visited this holds the longest path below it, pushed up by its children
+    remaining = dict.fromkeys(graph, 0.0)
+    queue = deque(task_id for task_id, count in pending.items() if count == 0)
+    while queue:
+        task_id = queue.popleft()
+        path = remaining[task_id] = estimate(task_id) + remaining[task_id]
+        for parent in graph[task_id]:
+            if path > remaining[parent]:
+                remaining[parent] = path
+            pending[parent] -= 1
+            if pending[parent] == 0:
+                queue.append(parent)
+    return remaining
+
+
+def predicted_critical_path(graph: Dict[str, List[str]], dependents: Dict[str, List[str]],
+                            priorities: Dict[str, float]) -> List[str]:
+    """The chain the priorities say bounds the makespan: heaviest root, then heaviest child"""
+    roots = [task_id for task_id, deps in graph.items() if not deps]
+    if not roots:
+        return []
+    path = [max(roots, key=priorities.__getitem__)]
+    while dependents[path[-1]]:
+        path.append(max(dependents[path[-1]], key=priorities.__getitem__))
+    return path
+
+
+def actual_critical_path(graph: Dict[str, List[str]], finished_at: Callable[[str], Optional[float]]) -> List[str]:
+    """Walk back from the last task to finish through the prerequisite that released it"""
+    last = None
+    for task_id in graph:
+        finished = finished_at(task_id)
+        if finished is not None and (last is None or finished > last[0]):
+            last = (finished, task_id)
+    if last is None:
+        return []
+    task_id = last[1]
+    path = [task_id]
+    while True:
+        deps = [dep for dep in graph[task_id] if finished_at(dep) is not None]
+        if not deps:
+            break
+        task_id = max(deps, key=finished_at)
+        path.append(task_id)
+    path.reverse()
+    return path
+
+
+class ReadyQueue:
+    """Ready tasks, highest priority first, with a fairness guard
+
+    Every `fairness_interval`-th pop takes the longest-waiting task instead,
+    so low-priority work cannot starve behind a steady stream of urgent tasks.
+    Both orders are kept (heap + FIFO) with lazy deletion; push and pop are
+    O(log n) amortised.
+    """
+
+    def __init__(self, fairness_interval: int = 16):
+        self.fairness_interval = fairness_interval
+        self._heap: List[Tuple[float, int, str]] = []
+        self._fifo: deque = deque()
+        self._queued = set()
+        self._pops = 0
+        self._seq = 0
+
+    def push(self, task_id: str, priority: float):
+        self._seq += 1
+        heapq.heappush(self._heap, (-priority, self._seq, task_id))
+        self._fifo.append(task_id)
+        self._queued.add(task_id)
+
+    def pop(self) -> str:
+        self._pops += 1
+        if self.fairness_interval and self._pops % self.fairness_interval == 0:
+            source = self._fifo.popleft
+        else:
+            source = lambda: heapq.heappop(self._heap)[2]
+        while True:
+            task_id = source()
+            if task_id in self._queued:
+                self._queued.discard(task_id)
+                break
+        self._compact()
+        return task_id
+
+    def _compact(self):
+        # Drop stale entries left at the front of either order by the other's pops
+        while self._fifo and self._fifo[0] not in self._queued:
+            self._fifo.popleft()
+        while self._heap and self._heap[0][2] not in self._queued:
+            heapq.heappop(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def __bool__(self) -> bool:
+        return bool(self._queued)
@@ -0,0 +1,67 @@
+"""
+Journal resume tests: a finished run leaves nothing behind, and journaled
+completions only apply while the task is unchanged
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from orchestrator import HypervelocityOrchestrator, Task  # noqa: E402
+
+
+def run(tmp_path: Path, tasks) -> dict:
+    async def main():
+        orchestrator = HypervelocityOrchestrator(max_workers=4, output_dir=str(tmp_path / "output"),
+                                                 journal_file=str(tmp_path / "journal.jsonl"))
+        try:
+            return dict(zip((task.id for task in tasks), await orchestrator.run_parallel(tasks)))
+        finally:
+            await orchestrator.shutdown()
+    return asyncio.run(main())
+
+
+def runs(log: Path) -> list:
+    return log.read_text().split() if log.exists() else []
+
+
+def test_same_journal_twice_runs_everything_twice(tmp_path):
+    log = tmp_path / "runs.log"
+
+    def tasks():
+        return [
+            Task("a", "A", f"echo a >> {log}", []),
+            Task("b", "B", f"echo b >> {log}", ["a"]),
+        ]
+
+    run(tmp_path, tasks())
+    assert not (tmp_path / "journal.jsonl").exists()
+    results = run(tmp_path, tasks())
+    assert sorted(results) == ["a", "b"]
+    assert sorted(runs(log)) == ["a", "a", "b", "b"]
+
+
+def test_changed_command_reruns_task_and_dependents(tmp_path):
+    log = tmp_path / "runs.log"
+
+    def tasks(a_command):
+        return [
+            Task("a", "A", a_command, []),
+            Task("b", "B", f"echo b >> {log}", ["a"]),
+            Task("c", "C", f"echo c >> {log}", []),
+            # Keeps the run unfinished, so its journal is what the next run resumes from
+            Task("broken", "Broken", "exit 1", [], max_retries=1),
+        ]
+
+    run(tmp_path, tasks(f"echo a >> {log}"))
+    assert sorted(runs(log)) == ["a", "b", "c"]
+
+    # Unchanged: nothing that completed runs again
+    run(tmp_path, tasks(f"echo a >> {log}"))
+    assert sorted(runs(log)) == ["a", "b", "c"]
+
+    # a's command changed: a and its dependent b rerun, c does not
+    run(tmp_path, tasks(f"echo A >> {log}"))
+    assert sorted(runs(log)) == ["A", "a", "b", "b", "c"]
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Gateway load benchmarks
+Starts stub upstreams and the gateway locally, drives load, and records JSON results
+
+Usage:
+    python3 run.py --scenario proxy --mode closed --concurrency 64 --duration 20
+    python3 run.py --scenario compression --mode open --rate 300 --output results/compression.json
+    python3 run.py --all --duration 10 --output-dir results/
+    python3 run.py --compare results/before.json results/after.json --threshold 0.10
+    python3 run.py --all --gateway-dir /tmp/gateway-baseline/05-integration-hubs/api-gateway --output-dir results/base/
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+GATEWAY_DIR = BENCH_DIR.parent
+
+# Registry names and their env prefixes, mirroring gateway.SERVICES
+SERVICE_PREFIXES = {
+    "autohelix": "AUTOHELIX",
+    "apex": "APEX",
+    "mlops": "MLOPS",
+    "nwu": "NWU",
+    "ai-ops": "AIOPS",
+    "tree-of-life": "TOL",
+}
+
+# Each scenario: stub behaviour, extra gateway env, and what the client requests.
+# Rate limits and concurrency limits are lifted out of the way except where the
+# limiter itself is under test, so the numbers reflect proxying cost.
+# BENCH_LIFT_RATE_LIMIT does the same for gateways that predate RATE_LIMIT_DEFAULT (see gateway_app.py).
+UNLIMITED = {"RATE_LIMIT_DEFAULT": "1000000000/1", "BENCH_LIFT_RATE_LIMIT": "1"}
+for _prefix in SERVICE_PREFIXES.values():
+    UNLIMITED[f"{_prefix}_CONCURRENCY"] = "512"
+    UNLIMITED[f"{_prefix}_CONCURRENCY_MAX"] = "1024"
+SCENARIOS = {
+    "proxy": {
+        "description": "Small JSON responses, baseline proxying cost",
+        "stub": {"latency_ms": 5, "payload_bytes": 1024},
+        "env": UNLIMITED,
+        "path": "/api/autohelix/items/1",
+    },
+    "large-payload": {
+        "description": "1 MiB binary bodies streamed through",
+        "stub": {"latency_ms": 5, "payload_bytes": 1024 * 1024},
+        "env": UNLIMITED,
+        "path": "/api/mlops/models/artifact",
+        "headers": {"accept-encoding": "identity"},
+    },
+    "compression": {
+        "description": "256 KiB compressible JSON, client accepts gzip",
+        "stub": {"latency_ms": 5, "payload_bytes": 256 * 1024, "compressible": True},
+        "env": UNLIMITED,
+        "path": "/api/apex/components",
+        "headers": {"accept-encoding": "gzip"},
+    },
+    "rate-limited": {
+        "description": "Limiter rejecting most traffic (429 path cost)",
+        "stub": {"latency_ms": 5, "payload_bytes": 1024},
+        "env": {"RATE_LIMIT_DEFAULT": "100/1"},
+        "path": "/api/nwu/bonds",
+        # Rejections are the point here, so the non-2xx check is skipped
+        "expect_rejections": True,
+    },
+    "cache": {
+        "description": "Cache-enabled service answering from memory",
+        "stub": {"latency_ms": 20, "payload_bytes": 4096, "compressible": True, "cache_seconds": 60},
+        "env": dict(UNLIMITED, APEX_CACHE="true"),
+        "path": "/api/apex/catalog",
+    },
+    "errors": {
+        "description": "Upstream failing 20% of requests",
+        "stub": {"latency_ms": 5, "payload_bytes": 1024, "error_rate": 0.2},
+        "env": UNLIMITED,
+        "path": "/api/ai-ops/incidents",
+    },
+    "metrics-scrape": {
+        "description": "Proxy load while /metrics is scraped 10 times a second",
+        "stub": {"latency_ms": 5, "payload_bytes": 1024},
+        "env": UNLIMITED,
+        "path": "/api/autohelix/items/1",
+        "scrape_hz": 10,
+    },
+}
+
+# Relative change that counts as a regression when comparing runs
+HIGHER_IS_WORSE = ["latency_ms.p50", "latency_ms.p99", "latency_ms.p999", "gateway.cpu_seconds_per_request", "gateway.rss_peak_mb"]
+LOWER_IS_WORSE = ["throughput_rps"]
+# Non-2xx rate above the stub's injected error rate by more than this fails the run
+NON_2XX_TOLERANCE = 0.05
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_http(url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+class ProcessSampler:
+    """CPU time and RSS of a process tree, read from /proc (Linux only)"""
+
+    CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.rss_peak = 0
+        self.rss_last = 0
+
+    def tree(self) -> List[int]:
+        pids, stack = [], [self.pid]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            for children in Path(f"/proc/{pid}/task").glob("*/children"):
+                try:
+                    stack.extend(int(child) for child in children.read_text().split())
+                except OSError:
+                    pass
+        return pids
+
+    def cpu_seconds(self) -> float:
+        total = 0
+        for pid in self.tree():
+            try:
+                fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+                total += int(fields[11]) + int(fields[12])  # utime + stime
+            except (OSError, IndexError):
+                pass
+        return total / self.CLOCK_TICKS
+
+    def sample_rss(self):
+        rss = 0
+        for pid in self.tree():
+            try:
+                rss += int(Path(f"/proc/{pid}/statm").read_text().split()[1]) * self.PAGE_SIZE
+            except (OSError, IndexError):
+                pass
+        self.rss_last = rss
+        self.rss_peak = max(self.rss_peak, rss)
+
+
+class Stack:
+    """Stub upstreams plus one gateway, torn down together"""
+
+    def __init__(self, scenario: dict, workers: int, gateway_dir: Path = GATEWAY_DIR):
+        self.scenario = scenario
+        self.workers = workers
+        self.gateway_dir = gateway_dir
+        self.processes: List[subprocess.Popen] = []
+        self.gateway: Optional[subprocess.Popen] = None
+        self.gateway_url = ""
+
+    def __enter__(self):
+        env = dict(os.environ, **self.scenario["env"])
+        for name, prefix in SERVICE_PREFIXES.items():
+            port = free_port()
+            self.processes.append(subprocess.Popen(
+                [sys.executable, str(BENCH_DIR / "stub_upstream.py"), "--port", str(port)] + stub_args(self.scenario["stub"])
+            ))
+            env[f"{prefix}_URL"] = f"http://127.0.0.1:{port}"
+            wait_for_http(f"http://127.0.0.1:{port}/health")
+
+        port = free_port()
+        # gateway_app wraps the gateway in gateway_dir, which may be another checkout (e.g. the baseline)
+        env["PYTHONPATH"] = os.pathsep.join([str(self.gateway_dir), str(BENCH_DIR)])
+        self.gateway = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "gateway_app:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(self.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=self.gateway_dir, env=env,
+        )
+        self.processes.append(self.gateway)
+        self.gateway_url = f"http://127.0.0.1:{port}"
+        wait_for_http(f"{self.gateway_url}/health")
+        return self
+
+    def __exit__(self, *exc):
+        for process in self.processes:
+            process.send_signal(signal.SIGINT)
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def stub_args(stub: dict) -> List[str]:
+    args = []
+    for key, value in stub.items():
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            args.append(flag)
+        elif value is not False:
+            args += [flag, str(value)]
+    return args
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+
+    def record(self, latency: float, status: Optional[int] = None, error: Optional[str] = None):
+        self.latencies.append(latency)
+        if error:
+            self.errors[error] += 1
+        else:
+            self.statuses[status] += 1
+
+
+async def fetch(client: httpx.AsyncClient, url: str, headers: Dict[str, str], recorder: Recorder, scheduled: float):
+    """Latency is measured from the scheduled send time to avoid coordinated omission"""
+    try:
+        async with client.stream("GET", url, headers=headers) as response:
+            async for _ in response.aiter_raw():
+                pass
+        recorder.record(time.perf_counter() - scheduled, status=response.status_code)
+    except httpx.HTTPError as e:
+        recorder.record(time.perf_counter() - scheduled, error=type(e).__name__)
+
+
+async def closed_loop(client, url, headers, recorder, concurrency: int, duration: float):
+    """Fixed number of clients, each sending its next request as soon as the last one finishes"""
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await fetch(client, url, headers, recorder, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(client, url, headers, recorder, rate: float, duration: float, max_outstanding: int) -> int:
+    """Fixed arrival rate regardless of response times; returns requests dropped at the client"""
+    start = time.perf_counter()
+    total = int(rate * duration)
+    pending = set()
+    dropped = 0
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(pending) >= max_outstanding:
+            dropped += 1
+            continue
+        task = asyncio.create_task(fetch(client, url, headers, recorder, scheduled))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    await asyncio.gather(*pending)
+    return dropped
+
+
+async def scrape(client: httpx.AsyncClient, base_url: str, hz: float, stop: asyncio.Event):
+    while not stop.is_set():
+        await client.get(f"{base_url}/metrics")
+        try:
+            await asyncio.wait_for(stop.wait(), 1 / hz)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def sample_process(sampler: ProcessSampler, stop: asyncio.Event):
+    while not stop.is_set():
+        sampler.sample_rss()
+        try:
+            await asyncio.wait_for(stop.wait(), 0.25)
+        except asyncio.TimeoutError:
+            pass
+
+
+def status_mix(statuses: Dict[str, int], errors: Dict[str, int]) -> Dict[str, float]:
+    """Share of requests per status class, transport errors included"""
+    total = sum(statuses.values()) + sum(errors.values())
+    mix = Counter()
+    for status, count in statuses.items():
+        mix[f"{str(status)[0]}xx"] += count
+    mix["transport_error"] += sum(errors.values())
+    return {name: round(count / total, 4) for name, count in sorted(mix.items()) if count} if total else {}
+
+
+def non_2xx_rate(results: dict) -> float:
+    return round(1.0 - status_mix(results["status_counts"], results["transport_errors"]).get("2xx", 0.0), 4)
+
+
+def status_check(scenario: dict, results: dict) -> Optional[dict]:
+    """Compare the non-2xx rate with the error rate the stub injects; None when rejections are expected"""
+    if scenario.get("expect_rejections"):
+        return None
+    expected = scenario["stub"].get("error_rate", 0.0)
+    rate = non_2xx_rate(results)
+    return {"expected_non_2xx_rate": expected, "non_2xx_rate": rate, "ok": rate <= expected + NON_2XX_TOLERANCE}
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def drive(args, scenario: dict, stack: Stack) -> dict:
+    url = stack.gateway_url + scenario["path"]
+    headers = scenario.get("headers", {})
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    recorder = Recorder()
+    sampler = ProcessSampler(stack.gateway.pid)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        # Warm up connections, caches and lazily created metric children
+        warm = Recorder()
+        await closed_loop(client, url, headers, warm, min(args.concurrency, 16), args.warmup)
+
+        stop = asyncio.Event()
+        background = [asyncio.create_task(sample_process(sampler, stop))]
+        if scenario.get("scrape_hz"):
+            background.append(asyncio.create_task(scrape(client, stack.gateway_url, scenario["scrape_hz"], stop)))
+
+        cpu_before = sampler.cpu_seconds()
+        started = time.perf_counter()
+        dropped = 0
+        if args.mode == "closed":
+            await closed_loop(client, url, headers, recorder, args.concurrency, args.duration)
+        else:
+            dropped = await open_loop(client, url, headers, recorder, args.rate, args.duration, args.max_outstanding)
+        elapsed = time.perf_counter() - started
+        cpu_used = sampler.cpu_seconds() - cpu_before
+
+        stop.set()
+        await asyncio.gather(*background)
+
+    ordered = sorted(recorder.latencies)
+    completed = len(ordered)
+    statuses = {str(status): count for status, count in sorted(recorder.statuses.items())}
+    return {
+        "requests": completed,
+        "dropped_at_client": dropped,
+        "throughput_rps": round(completed / elapsed, 1),
+        "status_counts": statuses,
+        "transport_errors": dict(recorder.errors),
+        "status_mix": status_mix(statuses, recorder.errors),
+        "latency_ms": {
+            "mean": round(sum(ordered) / completed * 1000, 3) if completed else 0.0,
+            "p50": round(percentile(ordered, 0.50) * 1000, 3),
+            "p90": round(percentile(ordered, 0.90) * 1000, 3),
+            "p99": round(percentile(ordered, 0.99) * 1000, 3),
+            "p999": round(percentile(ordered, 0.999) * 1000, 3),
+            "max": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        },
+        "gateway": {
+            "cpu_cores_used": round(cpu_used / elapsed, 3),
+            "cpu_seconds_per_request": round(cpu_used / completed, 7) if completed else 0.0,
+            "rss_peak_mb": round(sampler.rss_peak / 2**20, 1),
+            "rss_end_mb": round(sampler.rss_last / 2**20, 1),
+        },
+    }
+
+
+def git_revision(directory: Path = GATEWAY_DIR) -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=directory,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(args, name: str) -> dict:
+    scenario = SCENARIOS[name]
+    print(f"\033[95m▶️  {name}: {scenario['description']} ({args.mode} loop)\033[0m")
+    with Stack(scenario, args.workers, args.gateway_dir) as stack:
+        results = asyncio.run(drive(args, scenario, stack))
+    results["status_check"] = status_check(scenario, results)
+    print(f"\033[92m   ✓ {results['throughput_rps']} req/s, p50 {results['latency_ms']['p50']}ms, "
+          f"p99 {results['latency_ms']['p99']}ms, p999 {results['latency_ms']['p999']}ms, "
+          f"CPU {results['gateway']['cpu_cores_used']} cores, RSS {results['gateway']['rss_peak_mb']}MB\033[0m")
+    mix = ", ".join(f"{name} {share:.1%}" for name, share in results["status_mix"].items())
+    check = results["status_check"]
+    if check is not None and not check["ok"]:
+        print(f"\033[91m   ✗ {check['non_2xx_rate']:.1%} non-2xx, stub injects {check['expected_non_2xx_rate']:.0%}: {mix}\033[0m")
+    else:
+        print(f"\033[92m   ✓ Statuses: {mix}\033[0m")
+    return {
+        "scenario": name,
+        "description": scenario["description"],
+        "mode": args.mode,
+        "config": {
+            "duration_s": args.duration,
+            "concurrency": args.concurrency if args.mode == "closed" else None,
+            "rate_rps": args.rate if args.mode == "open" else None,
+            "gateway_workers": args.workers,
+            "stub": scenario["stub"],
+            "env": scenario["env"],
+        },
+        "environment": {
+            "gateway_dir": str(args.gateway_dir),
+            "git_revision": git_revision(args.gateway_dir),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+
+
+def lookup(data: dict, dotted: str) -> Optional[float]:
+    for key in dotted.split("."):
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def compare(baseline_path: str, candidate_path: str, threshold: float) -> int:
+    """Print metric deltas between two result files; non-zero exit on regression"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    candidate = json.loads(Path(candidate_path).read_text())
+    baseline_runs = {run["scenario"]: run for run in (baseline if isinstance(baseline, list) else [baseline])}
+    candidate_runs = candidate if isinstance(candidate, list) else [candidate]
+
+    regressions = 0
+    for run in candidate_runs:
+        before = baseline_runs.get(run["scenario"])
+        if before is None:
+            print(f"⚠️  {run['scenario']}: no baseline")
+            continue
+        print(f"\033[96m📊 {run['scenario']}\033[0m")
+        for metric, worse_when_higher in [(m, True) for m in HIGHER_IS_WORSE] + [(m, False) for m in LOWER_IS_WORSE]:
+            old, new = lookup(before["results"], metric), lookup(run["results"], metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change > threshold if worse_when_higher else change < -threshold
+            regressions += regressed
+            marker = "\033[91m✗ REGRESSION\033[0m" if regressed else ""
+            print(f"   {metric:34} {old:>12} -> {new:<12} {change:+.1%} {marker}")
+
+        # Error rates are compared in absolute terms; a relative change from ~0% means nothing
+        old, new = non_2xx_rate(before["results"]), non_2xx_rate(run["results"])
+        check = run["results"].get("status_check")
+        regressed = new - old > NON_2XX_TOLERANCE or (check is not None and not check["ok"])
+        regressions += regressed
+        marker = "\033[91m✗ REGRESSION\033[0m" if regressed else ""
+        print(f"   {'non_2xx_rate':34} {old:>12} -> {new:<12} {new - old:+.1%} {marker}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gateway load benchmarks with local stub upstreams')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='proxy')
+    parser.add_argument('--all', action='store_true', help='Run every scenario')
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed',
+                        help='closed: fixed concurrency; open: fixed arrival rate')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--rate', type=float, default=500.0, help='Requests per second in open-loop mode')
+    parser.add_argument('--max-outstanding', type=int, default=2000,
+                        help='Open-loop requests in flight before new arrivals are dropped')
+    parser.add_argument('--duration', type=float, default=20.0, help='Measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--workers', type=int, default=1, help='Gateway uvicorn workers')
+    parser.add_argument('--max-connections', type=int, default=256, help='Load generator connection pool size')
+    parser.add_argument('--gateway-dir', type=Path, default=GATEWAY_DIR,
+                        help='Gateway checkout to benchmark, e.g. a git worktree of the baseline')
+    parser.add_argument('--output', help='Write results JSON to this file')
+    parser.add_argument('--output-dir', help='With --all, write one <scenario>.json per scenario here')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'))
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative change flagged as a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    names = sorted(SCENARIOS) if args.all else [args.scenario]
+    runs = []
+    for name in names:
+        run = run_scenario(args, name)
+        runs.append(run)
+        if args.output_dir:
+            out = Path(args.output_dir)
+            out.mkdir(parents=True, exist_ok=True)
+            (out / f"{name}.json").write_text(json.dumps(run, indent=2))
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(runs if len(runs) > 1 else runs[0], indent=2))
+    elif not args.output_dir:
+        print(json.dumps(runs if len(runs) > 1 else runs[0], indent=2))
+    # Results are written either way; the exit status flags scenarios with unexpected errors
+    failed = [run["scenario"] for run in runs if run["results"]["status_check"] and not run["results"]["status_check"]["ok"]]
+    if failed:
+        print(f"\033[91m✗ Unexpected non-2xx rate in: {', '.join(failed)}\033[0m", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Stub backend for gateway benchmarks
+Answers every path with a fixed-size payload after a configurable delay and error rate
+
+Usage:
+    python3 stub_upstream.py --port 9001 --latency-ms 5 --payload-bytes 2048 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+
+def build_app(latency_ms: float, jitter_ms: float, payload_bytes: int, error_rate: float,
+              compressible: bool, cache_seconds: int):
+    if compressible:
+        # Repetitive JSON, roughly what list endpoints return
+        record = {"id": 0, "name": "component", "status": "operational", "score": 0.97}
+        count = max(payload_bytes // (len(json.dumps(record)) + 8), 1)
+        body = json.dumps({"items": [dict(record, id=i) for i in range(count)]}).encode()
+    else:
+        body = random.Random(42).randbytes(payload_bytes)
+
+    content_type = b"application/json" if compressible else b"application/octet-stream"
+    headers = [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+    if cache_seconds:
+        headers += [(b"cache-control", f"max-age={cache_seconds}".encode()), (b"etag", b'"bench"')]
+    error_body = b'{"error": "injected failure"}'
+    error_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(error_body)).encode())]
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        # Drain the request body so keep-alive connections stay usable
+        while (await receive()).get("more_body"):
+            pass
+
+        if scope["path"] == "/health":
+            await send({"type": "http.response.start", "status": 200, "headers": error_headers[:1]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        delay = latency_ms + (random.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if error_rate and random.random() < error_rate:
+            await send({"type": "http.response.start", "status": 500, "headers": error_headers})
+            await send({"type": "http.response.body", "body": error_body})
+            return
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stub upstream for gateway benchmarks')
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--payload-bytes', type=int, default=1024)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--compressible', action='store_true',
+                        help='Serve repetitive JSON instead of random bytes')
+    parser.add_argument('--cache-seconds', type=int, default=0,
+                        help='Send Cache-Control max-age and an ETag')
+    args = parser.parse_args()
+
+    import uvicorn
+    app = build_app(args.latency_ms, args.jitter_ms, args.payload_bytes, args.error_rate,
+                    args.compressible, args.cache_seconds)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == '__main__':
+    main()
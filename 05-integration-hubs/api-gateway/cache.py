@@ -0,0 +1,165 @@
+"""
+Response caching for the API Gateway
+Byte-budgeted LRU of upstream responses plus single-flight request coalescing
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into {directive: argument-or-None}"""
+    directives = {}
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _seconds(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    etag: Optional[str] = None
+    max_age: int = 0
+    stale_while_revalidate: int = 0
+    stored_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+    def age(self, now: float) -> float:
+        return now - self.stored_at
+
+    def is_fresh(self, now: float) -> bool:
+        return self.age(now) < self.max_age
+
+    def is_servable_stale(self, now: float) -> bool:
+        return self.age(now) < self.max_age + self.stale_while_revalidate
+
+    def refresh(self, cache_control: Dict[str, Optional[str]], default_swr: int):
+        """Reset freshness after a 304 revalidation"""
+        self.max_age = freshness_lifetime(cache_control) or self.max_age
+        self.stale_while_revalidate = _swr(cache_control, default_swr)
+        self.stored_at = time.monotonic()
+
+
+def freshness_lifetime(cache_control: Dict[str, Optional[str]]) -> int:
+    """Shared-cache TTL: s-maxage wins over max-age; 0 means not storable"""
+    if {"no-store", "no-cache", "private"} & cache_control.keys():
+        return 0
+    ttl = _seconds(cache_control.get("s-maxage"))
+    if ttl is None:
+        ttl = _seconds(cache_control.get("max-age"))
+    return max(ttl or 0, 0)
+
+
+def _swr(cache_control: Dict[str, Optional[str]], default: int) -> int:
+    value = _seconds(cache_control.get("stale-while-revalidate"))
+    return default if value is None else max(value, 0)
+
+
+def build_entry(status_code: int, headers: List[Tuple[str, str]], body: bytes, default_swr: int) -> CachedResponse:
+    """Wrap an upstream response, with freshness taken from its Cache-Control"""
+    lookup = {k.lower(): v for k, v in headers}
+    cache_control = parse_cache_control(lookup.get("cache-control", ""))
+    return CachedResponse(
+        status_code=status_code,
+        headers=headers,
+        body=body,
+        etag=lookup.get("etag"),
+        max_age=freshness_lifetime(cache_control),
+        stale_while_revalidate=_swr(cache_control, default_swr),
+    )
+
+
+def is_storable(entry: CachedResponse) -> bool:
+    """Only plain 200s that are shareable and vary on nothing but encoding"""
+    if entry.status_code != 200 or entry.max_age <= 0:
+        return False
+    for key, value in entry.headers:
+        key = key.lower()
+        if key == "set-cookie":
+            return False
+        if key == "vary" and any(v.strip().lower() != "accept-encoding" for v in value.split(",")):
+            return False
+    return True
+
+
+class ResponseCache:
+    """LRU keyed by request, bounded by total stored bytes rather than entry count"""
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> bool:
+        if entry.size > self.max_entry_bytes:
+            return False
+        self.discard(key)
+        self._entries[key] = entry
+        self.current_bytes += entry.size
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.size
+        return True
+
+    def discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one in-flight task
+
+    The shared call runs as its own task, so a caller disconnecting does not
+    cancel the fetch for everyone else waiting on it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return (result, shared) where shared means another caller led the fetch"""
+        task = self._calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), shared
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
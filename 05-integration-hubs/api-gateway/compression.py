@@ -0,0 +1,232 @@
+"""
+Response compression for the API Gateway
+Accept-Encoding negotiation (zstd/br/gzip), upstream-encoding passthrough and
+off-loop compression of large bodies
+"""
+
+import asyncio
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional: br is simply not offered
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is simply not offered
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml",
+    "application/x-ndjson", "application/graphql", "image/svg+xml",
+)
+COMPRESSIBLE_SUFFIXES = ("+json", "+xml")
+
+
+class GzipStream:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(min(max(level, 1), 9), zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        # Sync flush so each streamed chunk reaches the client promptly
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliStream:
+    name = "br"
+
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=min(max(level, 0), 11))
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdStream:
+    name = "zstd"
+
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=min(max(level, 1), 22)).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+CODECS = {"gzip": GzipStream}
+if brotli is not None:
+    CODECS["br"] = BrotliStream
+if zstandard is not None:
+    CODECS["zstd"] = ZstdStream
+
+
+def negotiate(accept_encoding: str, preference: List[str]) -> Optional[str]:
+    """Pick the client's highest-q encoding we support; ties go to server preference"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in preference:
+        q = weights.get(name, wildcard)
+        if name in CODECS and q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith(COMPRESSIBLE_TYPES) or media_type.endswith(COMPRESSIBLE_SUFFIXES)
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """Parse 'content-type-prefix=level,...', e.g. 'application/json=4,text/=6'"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, level = item.partition("=")
+        levels[prefix.strip().lower()] = int(level)
+    return levels
+
+
+class CompressionMiddleware:
+    """Compress responses the upstream left unencoded
+
+    Bodies that already carry a Content-Encoding (upstream-compressed and
+    streamed through raw) are passed on untouched. Chunks of at least
+    `offload_size` bytes are compressed on a thread pool, since zlib, brotli
+    and zstd all release the GIL, keeping the event loop free.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1000,
+        offload_size: int = 64 * 1024,
+        default_level: int = 5,
+        levels: Optional[Dict[str, int]] = None,
+        preference: Optional[List[str]] = None,
+        threads: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.default_level = default_level
+        # Longest prefix first so 'application/json' beats 'application/'
+        self.levels = sorted((levels or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.preference = preference or ["zstd", "br", "gzip"]
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="compress")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.preference)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def level_for(self, content_type: str) -> int:
+        content_type = content_type.lower()
+        for prefix, level in self.levels:
+            if content_type.startswith(prefix):
+                return level
+        return self.default_level
+
+    async def run(self, fn, data: bytes) -> bytes:
+        if len(data) >= self.offload_size:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, data)
+        return fn(data)
+
+
+class CompressionResponder:
+    """Per-response state: holds back the start message until the first body chunk decides"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message = None
+        self.stream = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not self._should_compress(headers, body, more_body):
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+            self.stream = CODECS[self.encoding](self.middleware.level_for(headers.get("content-type", "")))
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = await self.middleware.run(self._compress_all, body)
+                headers["Content-Length"] = str(len(body))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            await self._send(self.start_message)
+
+        chunk = await self.middleware.run(self.stream.compress, body) if body else b""
+        if not more_body:
+            chunk += self.stream.finish()
+        if chunk or not more_body:
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _compress_all(self, body: bytes) -> bytes:
+        return self.stream.compress(body) + self.stream.finish()
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes, more_body: bool) -> bool:
+        if "content-encoding" in headers:
+            return False  # already encoded upstream: pass through as-is
+        if self.start_message["status"] in (204, 206, 304):
+            return False
+        if not is_compressible(headers.get("content-type", "")):
+            return False
+        size = len(body) if not more_body else int(headers.get("content-length", self.middleware.minimum_size))
+        if size < self.middleware.minimum_size:
+            return False
+        return True
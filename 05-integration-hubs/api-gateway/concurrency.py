@@ -0,0 +1,159 @@
+"""
+Adaptive concurrency limiting for the API Gateway
+Per-service AIMD limits on observed latency, a bounded priority queue and load shedding
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from enum import IntEnum
+from typing import List, Optional
+
+
+class Priority(IntEnum):
+    """Lower value = more important; shed from the bottom up"""
+    CRITICAL = 0
+    AUTHENTICATED = 1
+    ANONYMOUS = 2
+
+
+# Fraction of the current limit a class may fill before it has to queue, and
+# fraction of the wait queue it may occupy; the rest is headroom for higher classes
+ADMISSION_SHARE = {Priority.CRITICAL: 1.0, Priority.AUTHENTICATED: 0.9, Priority.ANONYMOUS: 0.75}
+QUEUE_SHARE = {Priority.CRITICAL: 1.0, Priority.AUTHENTICATED: 1.0, Priority.ANONYMOUS: 0.5}
+
+
+class Overloaded(Exception):
+    """The request was shed; retry after `retry_after` seconds"""
+
+    def __init__(self, service: str, reason: str, retry_after: float):
+        super().__init__(f"Service '{service}' overloaded: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency limit that grows additively while latency stays near the
+    no-load baseline and backs off multiplicatively when it rises or calls fail
+    """
+
+    # Samples before the no-load latency baseline is re-measured
+    BASELINE_WINDOW = 1000
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 20,
+        min_limit: int = 2,
+        max_limit: int = 200,
+        queue_size: int = 50,
+        queue_timeout: float = 1.0,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.inflight = 0
+        self.queued = 0
+        self.min_latency: Optional[float] = None
+        self.smoothed_latency = 0.0
+        self._samples = 0
+        self._last_decrease = 0.0
+        self._seq = itertools.count()
+        # Heap of [priority, seq, future]; cancelled waiters are skipped lazily
+        self._waiters: List[list] = []
+
+    @property
+    def current_limit(self) -> int:
+        return max(int(self.limit), self.min_limit)
+
+    def _has_room(self, priority: Priority) -> bool:
+        return self.inflight < self.current_limit * ADMISSION_SHARE[priority]
+
+    def retry_after(self) -> float:
+        """Rough time for the current backlog to drain"""
+        backlog = self.inflight + self.queued
+        return max(1.0, math.ceil(backlog * (self.smoothed_latency or 1.0) / self.current_limit))
+
+    async def acquire(self, priority: Priority = Priority.ANONYMOUS, timeout: Optional[float] = None):
+        """Take a slot, queueing up to the deadline; raises Overloaded when shed"""
+        if not self._waiters and self._has_room(priority):
+            self.inflight += 1
+            return
+
+        if self.queued >= self.queue_size * QUEUE_SHARE[priority] and not self._shed_lower(priority):
+            raise Overloaded(self.name, "queue full", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future]
+        heapq.heappush(self._waiters, entry)
+        self.queued += 1
+        wait = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        try:
+            await asyncio.wait_for(future, wait)
+        except asyncio.TimeoutError:
+            raise Overloaded(self.name, "queue timeout", self.retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Granted a slot just as the caller went away: hand it back
+                self.release()
+            raise
+        finally:
+            if not future.done() or future.cancelled():
+                self.queued -= 1
+
+    def _shed_lower(self, priority: Priority) -> bool:
+        """Evict the newest queued waiter of a lower class to make room"""
+        victims = [entry for entry in self._waiters if entry[0] > priority and not entry[2].done()]
+        if not victims:
+            return False
+        victim = max(victims, key=lambda entry: (entry[0], entry[1]))
+        victim[2].set_exception(Overloaded(self.name, "shed for higher priority", self.retry_after()))
+        self.queued -= 1
+        return True
+
+    def _wake(self):
+        waiters = self._waiters
+        while waiters:
+            priority, _, future = waiters[0]
+            if future.done():
+                heapq.heappop(waiters)
+                continue
+            if not self._has_room(priority):
+                break
+            heapq.heappop(waiters)
+            self.inflight += 1
+            self.queued -= 1
+            future.set_result(None)
+
+    def sample(self, latency: float, dropped: bool = False):
+        """Feed one upstream latency (time to response headers) into the limit"""
+        self._samples += 1
+        if self.min_latency is None or latency < self.min_latency or self._samples >= self.BASELINE_WINDOW:
+            self.min_latency = latency
+            self._samples = 0
+        self.smoothed_latency = latency if not self.smoothed_latency else 0.9 * self.smoothed_latency + 0.1 * latency
+
+        # Small absolute slack so sub-millisecond jitter on fast backends is not read as queueing
+        congested = dropped or latency > self.min_latency * self.tolerance + 0.005
+        now = time.monotonic()
+        if congested:
+            # At most one decrease per round trip, so a burst of slow replies does not collapse the limit
+            if now - self._last_decrease >= self.smoothed_latency:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.inflight >= self.limit / 2:
+            # Only grow while the limit is actually in use: +1 per limit's worth of good samples
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    def release(self):
+        self.inflight -= 1
+        self._wake()
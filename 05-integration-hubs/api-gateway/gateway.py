@@ -6,21 +6,67 @@ FastAPI-based gateway with OAuth2, rate limiting, and observability
 
 from fastapi import FastAPI, Request, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
-from starlette.responses import Response
+from starlette.background import BackgroundTask
+from starlette.responses import Response, StreamingResponse
 import httpx
 import time
 import os
-from typing import Optional
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import jwt
 from datetime import datetime, timedelta
+import asyncio
+import json
+import math
+
+from pydantic import BaseModel, Field
+
+from cache import CachedResponse, ResponseCache, SingleFlight, build_entry, is_storable, parse_cache_control
+from compression import CompressionMiddleware, parse_levels
+from concurrency import AdaptiveConcurrencyLimiter, Overloaded, Priority
+from metrics import (
+    BATCH_ITEMS, CACHE_BYTES, CACHE_REQUESTS, CIRCUIT_OPEN, CONCURRENCY, HEDGED_REQUESTS, MULTIPROCESS, RETRIES,
+    SHED_REQUESTS, UPSTREAM_POOL, UPSTREAM_REPLICAS, RequestMetrics, count_error, render,
+)
+from ratelimit import RateLimit, RateLimiter, build_backend, parse_rules
+from registry import RegistryWatcher, builtin_services, load_registry
+from retries import LatencyTracker, RetryBudget, backoff_delay
+from tracing import CLIENT, PhaseRecorder, Trace, Tracer, TracingMiddleware, build_exporter
+from upstreams import CircuitBreaker, Replica, UpstreamGroup, UpstreamUnavailable, upstream_outcome
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Compile the routing table (one pooled upstream client per service) for the lifetime of the app"""
+    install_routes(SERVICES)
+    housekeeping = []
+    if REGISTRY_FILE:
+        watcher = RegistryWatcher(REGISTRY_FILE, install_routes, float(os.getenv("REGISTRY_POLL_INTERVAL", "2")))
+        housekeeping.append(asyncio.create_task(watcher.run()))
+    if tracer.exporter is not None:
+        housekeeping.append(asyncio.create_task(tracer.exporter.run()))
+    if MULTIPROCESS:
+        # A scrape only reaches one worker, so every worker publishes its gauges on a timer
+        housekeeping.append(asyncio.create_task(publish_gauges(float(os.getenv("METRICS_GAUGE_INTERVAL", "5")))))
+    try:
+        yield
+    finally:
+        for task in housekeeping:
+            task.cancel()
+        await asyncio.gather(*housekeeping, return_exceptions=True)
+        await close_routes()
+        await rate_limiter.close()
+        if tracer.exporter is not None:
+            await tracer.exporter.close()
+
 
 app = FastAPI(
     title="Enterprise API Gateway v2",
     description="Unified API layer for $102M+ AI enterprise ecosystem",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Middleware
@@ -31,86 +77,316 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.add_middleware(GZipMiddleware, minimum_size=1000)
-
-# Prometheus Metrics
-REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP Requests', ['method', 'endpoint', 'status'])
-REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP Request Duration', ['method', 'endpoint'])
-ERROR_COUNT = Counter('http_errors_total', 'Total HTTP Errors', ['endpoint', 'error_type'])
-
-# Service Registry
-SERVICES = {
-    "autohelix": os.getenv("AUTOHELIX_URL", "http://autohelix:8000"),
-    "apex": os.getenv("APEX_URL", "http://apex:8001"),
-    "mlops": os.getenv("MLOPS_URL", "http://mlops:8100"),
-    "nwu": os.getenv("NWU_URL", "http://nwu:8200"),
-    "ai-ops": os.getenv("AIOPS_URL", "http://ai-ops:8300"),
-    "tree-of-life": os.getenv("TOL_URL", "http://tree-of-life:3000"),
-}
+# Negotiated gzip/br/zstd; bodies the upstream already encoded pass through as-is
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1000")),
+    offload_size=int(os.getenv("COMPRESSION_OFFLOAD_SIZE", str(64 * 1024))),
+    default_level=int(os.getenv("COMPRESSION_LEVEL", "5")),
+    levels=parse_levels(os.getenv("COMPRESSION_LEVELS", "application/json=4,application/x-ndjson=1,text/=6")),
+    preference=[e.strip() for e in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if e.strip()],
+    threads=int(os.getenv("COMPRESSION_THREADS", "4")),
+)
+
+# Prometheus Metrics (definitions live in metrics.py)
+request_metrics = RequestMetrics(
+    max_routes=int(os.getenv("METRICS_MAX_ROUTES", "100")),
+    max_services=int(os.getenv("METRICS_MAX_SERVICES", "64")),
+)
+
+
+# Service Registry: REGISTRY_FILE (native JSON or SYSTEMS-INVENTORY.json, reloaded
+# on change or SIGHUP) or, without it, the built-in services and their <PREFIX>_* env vars
+REGISTRY_FILE = os.getenv("REGISTRY_FILE")
+SERVICES: Dict[str, dict] = load_registry(REGISTRY_FILE) if REGISTRY_FILE else builtin_services()
+
+
+def build_upstream_group(name: str, config: dict) -> UpstreamGroup:
+    return UpstreamGroup(
+        name,
+        config["urls"],
+        strategy=config["lb_strategy"],
+        breaker=CircuitBreaker(config["breaker_failures"], config["breaker_reset"]),
+        ejection_failures=config["ejection_failures"],
+        ejection_time=config["ejection_time"],
+    )
+
+
+def build_concurrency_limiter(name: str, config: dict) -> AdaptiveConcurrencyLimiter:
+    return AdaptiveConcurrencyLimiter(
+        name,
+        initial_limit=config["concurrency_initial"],
+        min_limit=config["concurrency_min"],
+        max_limit=config["concurrency_max"],
+        queue_size=config["queue_size"],
+        queue_timeout=config["queue_timeout"],
+    )
+
+
+def build_upstream_client(config: dict) -> httpx.AsyncClient:
+    """Create a pooled client for a single registry entry (shared by its replicas)"""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(config["timeout"], connect=config["connect_timeout"]),
+        limits=httpx.Limits(
+            max_connections=config["max_connections"],
+            max_keepalive_connections=config["max_keepalive_connections"],
+            keepalive_expiry=config["keepalive_expiry"],
+        ),
+        http2=config["http2"],
+    )
+
+
+def pool_stats(client: httpx.AsyncClient) -> Dict[str, int]:
+    """Idle/active/waiting counts for a client's connection pool"""
+    # httpx has no public pool introspection; read the httpcore pool directly
+    pool = getattr(client._transport, "_pool", None)
+    if pool is None:
+        return {"idle": 0, "active": 0, "waiting": 0}
+    idle = sum(1 for conn in pool.connections if conn.is_idle())
+    waiting = sum(1 for req in pool._requests if req.is_queued())
+    return {"idle": idle, "active": len(pool._requests) - waiting, "waiting": waiting}
+
+
+# Settings each component is built from; a reload keeps the live component
+# (and its pool, health and limit state) when its settings are unchanged
+CLIENT_KEYS = ("timeout", "connect_timeout", "max_connections", "max_keepalive_connections", "keepalive_expiry", "http2")
+GROUP_KEYS = ("urls", "lb_strategy", "breaker_failures", "breaker_reset", "ejection_failures", "ejection_time")
+LIMITER_KEYS = ("concurrency_initial", "concurrency_min", "concurrency_max", "queue_size", "queue_timeout")
+CACHE_KEYS = ("cache", "cache_max_bytes", "cache_max_entry_bytes")
+HEALTH_KEYS = ("health_path", "health_interval", "health_timeout")
+BUDGET_KEYS = ("retry_budget_ratio", "retry_budget_min")
+HEDGE_KEYS = ("hedge_percentile", "hedge_min_delay")
+# Longest a replaced pool is kept open for the requests still using it
+RETIRE_GRACE = float(os.getenv("REGISTRY_RETIRE_GRACE", "300"))
+
+
+@dataclass(eq=False)
+class ServiceRoute:
+    """One compiled routing-table entry: a service's config and the live components serving it"""
+    name: str
+    config: dict
+    client: httpx.AsyncClient
+    group: UpstreamGroup
+    limiter: AdaptiveConcurrencyLimiter
+    cache: Optional[ResponseCache]
+    retry_budget: RetryBudget
+    latency: LatencyTracker
+    health_task: Optional[asyncio.Task] = None
+    # Requests between send_upstream() and close_upstream()
+    active: int = 0
+
+
+# Routing table, replaced as a whole on reload; a request keeps the route it started with
+routes: Dict[str, ServiceRoute] = {}
+retiring: set = set()
+
+
+def _unchanged(old: Optional[ServiceRoute], config: dict, keys: Tuple[str, ...]) -> bool:
+    return old is not None and all(old.config[key] == config[key] for key in keys)
+
+
+def compile_route(name: str, config: dict, old: Optional[ServiceRoute]) -> ServiceRoute:
+    client = old.client if _unchanged(old, config, CLIENT_KEYS) else build_upstream_client(config)
+    group = old.group if _unchanged(old, config, GROUP_KEYS) else build_upstream_group(name, config)
+    limiter = old.limiter if _unchanged(old, config, LIMITER_KEYS) else build_concurrency_limiter(name, config)
+    if _unchanged(old, config, CACHE_KEYS):
+        cache = old.cache
+    else:
+        cache = ResponseCache(config["cache_max_bytes"], config["cache_max_entry_bytes"]) if config["cache"] else None
+    if _unchanged(old, config, BUDGET_KEYS):
+        retry_budget = old.retry_budget
+    else:
+        retry_budget = RetryBudget(config["retry_budget_ratio"], config["retry_budget_min"])
+    if _unchanged(old, config, HEDGE_KEYS):
+        latency = old.latency
+    else:
+        latency = LatencyTracker(config["hedge_percentile"], floor=config["hedge_min_delay"])
+    route = ServiceRoute(name, config, client, group, limiter, cache, retry_budget, latency)
+    if old is not None and old.client is client and old.group is group and _unchanged(old, config, HEALTH_KEYS):
+        route.health_task = old.health_task
+    elif config["health_interval"] > 0:
+        route.health_task = asyncio.create_task(group.run_health_checks(
+            client, config["health_path"], config["health_interval"], config["health_timeout"]
+        ))
+    return route
+
+
+def install_routes(services: Dict[str, dict]):
+    """Compile `services` (already validated) and swap the routing table in
+
+    Nothing here awaits, so requests see either the old table or the new one.
+    Every route is built before any is swapped in; if one fails, the components
+    built so far are dropped and the old table stays. Replaced pools are closed
+    in the background once their requests drain.
+    """
+    global routes, SERVICES
+    previous = routes
+    table: Dict[str, ServiceRoute] = {}
+    try:
+        for name, config in services.items():
+            table[name] = compile_route(name, config, previous.get(name))
+        limits = {
+            name: RateLimit.parse(config["rate_limit"]) for name, config in services.items() if config["rate_limit"]
+        }
+    except Exception:
+        for route in table.values():
+            old = previous.get(route.name)
+            if route.health_task is not None and (old is None or route.health_task is not old.health_task):
+                route.health_task.cancel()
+            if old is None or route.client is not old.client:
+                run_in_background(route.client.aclose())
+        raise
+    routes, SERVICES = table, services
+    rate_limiter.services = limits
+
+    live_tasks = {id(route.health_task) for route in table.values()}
+    live_clients = {id(route.client) for route in table.values()}
+    for old in previous.values():
+        if old.health_task is not None and id(old.health_task) not in live_tasks:
+            old.health_task.cancel()
+        if id(old.client) not in live_clients:
+            retiring.add(old)
+            run_in_background(retire_route(old))
+
+
+async def retire_route(route: ServiceRoute):
+    """Close a replaced route's pool once in-flight requests have finished with it"""
+    deadline = time.monotonic() + RETIRE_GRACE
+    try:
+        while time.monotonic() < deadline:
+            stats = pool_stats(route.client)
+            if route.active == 0 and stats["active"] == 0 and stats["waiting"] == 0:
+                break
+            await asyncio.sleep(1)
+    finally:
+        retiring.discard(route)
+        await route.client.aclose()
+
+
+async def close_routes():
+    global routes
+    closing = list(routes.values()) + list(retiring)
+    tasks = [route.health_task for route in closing if route.health_task is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for route in closing:
+        await route.client.aclose()
+    routes = {}
+    retiring.clear()
 
 # JWT Configuration
 SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-# Rate Limiting (simple in-memory, use Redis in production)
-rate_limit_store = {}
+# Rate Limiting: token buckets per client, shared across workers with the redis backend
+rate_limiter = RateLimiter(
+    backend=build_backend(os.getenv("RATE_LIMIT_BACKEND", "memory"), os.getenv("REDIS_URL", "redis://localhost:6379/0")),
+    default=RateLimit.parse(os.getenv("RATE_LIMIT_DEFAULT", "100/60")),
+    services={
+        name: RateLimit.parse(config["rate_limit"])
+        for name, config in SERVICES.items() if config["rate_limit"]
+    },
+    # e.g. RATE_LIMIT_ROUTES="/api/mlops/predict=20/60,/api/apex/search=50/60"
+    routes=parse_rules(os.getenv("RATE_LIMIT_ROUTES", "")),
+)
+
+def service_label(request: Request) -> str:
+    """Registry name for proxied calls, 'gateway' for the gateway's own endpoints"""
+    path = request.url.path
+    if not path.startswith("/api/"):
+        return "gateway"
+    service = path[5:].split("/", 1)[0]
+    return service if service in routes else "unknown"
 
-def check_rate_limit(client_ip: str, limit: int = 100, window: int = 60) -> bool:
-    """Simple rate limiting - 100 requests per minute per IP"""
-    now = time.time()
-    if client_ip not in rate_limit_store:
-        rate_limit_store[client_ip] = []
-    
-    # Clean old requests
-    rate_limit_store[client_ip] = [req_time for req_time in rate_limit_store[client_ip] if now - req_time < window]
-    
-    if len(rate_limit_store[client_ip]) >= limit:
-        return False
-    
-    rate_limit_store[client_ip].append(now)
-    return True
 
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     """Add processing time and metrics"""
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     # Rate limiting
     client_ip = request.client.host
-    if not check_rate_limit(client_ip):
-        REQUEST_COUNT.labels(method=request.method, endpoint=request.url.path, status=429).inc()
+    check_start = time.perf_counter()
+    allowed, retry_after = await rate_limiter.check(client_ip, request.url.path)
+    request.state.trace.add_span("ratelimit", check_start, time.perf_counter())
+    if not allowed:
+        request_metrics.observe(request.method, "rate_limited", service_label(request), 429, time.perf_counter() - start_time)
+        retry_after = math.ceil(retry_after)
         return JSONResponse(
             status_code=429,
-            content={"error": "Rate limit exceeded", "retry_after": 60}
+            content={"error": "Rate limit exceeded", "retry_after": retry_after},
+            headers={"Retry-After": str(retry_after)}
         )
     
     response = await call_next(request)
     
-    process_time = time.time() - start_time
+    process_time = time.perf_counter() - start_time
     response.headers["X-Process-Time"] = str(process_time)
     response.headers["X-Gateway-Version"] = "2.0.0"
     
-    # Record metrics
-    REQUEST_COUNT.labels(method=request.method, endpoint=request.url.path, status=response.status_code).inc()
-    REQUEST_DURATION.labels(method=request.method, endpoint=request.url.path).observe(process_time)
+    # Record metrics by route template, never by raw path
+    route = request.scope.get("route")
+    request_metrics.observe(
+        request.method, route.path if route is not None else "unmatched",
+        service_label(request), response.status_code, process_time
+    )
     
     return response
 
+
+# Tracing wraps the middleware above (added later = outermost) so the rate-limit
+# check is timed; spans export only when sampled, Server-Timing goes on every response
+tracer = Tracer(
+    exporter=build_exporter(
+        os.getenv("TRACE_EXPORT_FILE"), os.getenv("TRACE_EXPORT_URL"), os.getenv("TRACE_SERVICE_NAME", "api-gateway")
+    ),
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0.01")),
+    # Tail sampling: also keep traces this slow (0 disables) and, optionally, every 5xx
+    slow_threshold=float(os.getenv("TRACE_SLOW_MS", "1000")) / 1000,
+    keep_errors=os.getenv("TRACE_KEEP_ERRORS", "true").lower() in ("1", "true", "yes", "on"),
+)
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "services": len(SERVICES),
+        "services": len(routes),
         "version": "2.0.0"
     }
 
 @app.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint"""
-    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    refresh_gauges()
+    content, media_type = render()
+    return Response(content=content, media_type=media_type)
+
+
+def refresh_gauges():
+    """Sample pool, replica, breaker and cache state into their gauges"""
+    for name, route in routes.items():
+        for state, value in pool_stats(route.client).items():
+            UPSTREAM_POOL.labels(service=name, state=state).set(value)
+        for state, value in route.group.state_counts().items():
+            UPSTREAM_REPLICAS.labels(service=name, state=state).set(value)
+        CIRCUIT_OPEN.labels(service=name).set({"closed": 0, "half_open": 0.5, "open": 1}[route.group.breaker.state])
+        CONCURRENCY.labels(service=name, state="limit").set(route.limiter.current_limit)
+        CONCURRENCY.labels(service=name, state="inflight").set(route.limiter.inflight)
+        CONCURRENCY.labels(service=name, state="queued").set(route.limiter.queued)
+        if route.cache is not None:
+            CACHE_BYTES.labels(service=name).set(route.cache.current_bytes)
+
+
+async def publish_gauges(interval: float):
+    while True:
+        refresh_gauges()
+        await asyncio.sleep(interval)
 
 @app.get("/")
 async def root():
@@ -118,44 +394,612 @@ async def root():
     return {
         "gateway": "Enterprise API Gateway v2",
         "ecosystem_value": "$102M+",
-        "services": list(SERVICES.keys()),
+        "services": list(routes.keys()),
         "documentation": "/docs",
         "health": "/health",
-        "metrics": "/metrics"
+        "metrics": "/metrics",
+        "batch": "/batch"
+    }
+
+# Hop-by-hop headers (RFC 7230 6.1) are connection-specific and never forwarded
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade",
+})
+
+
+def forward_headers(headers) -> Dict[str, str]:
+    """Strip hop-by-hop headers (and Host, which the upstream client sets)"""
+    return {
+        key: value for key, value in headers.items()
+        if key.lower() not in HOP_BY_HOP_HEADERS and key.lower() != "host"
     }
 
+
+def request_body(request: Request):
+    """Stream the client body through if there is one"""
+    if "content-length" in request.headers or "transfer-encoding" in request.headers:
+        return request.stream()
+    return None
+
+
+# Final path segments treated as health probes, which are never shed first
+HEALTH_PROBE_PATHS = frozenset({"health", "healthz", "ready", "readyz", "live", "livez"})
+
+
+def request_priority(request: Request, path: str) -> Priority:
+    """Shedding class: health probes, then callers with a valid token, then the rest"""
+    if path.rstrip("/").rsplit("/", 1)[-1] in HEALTH_PROBE_PATHS:
+        return Priority.CRITICAL
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            return Priority.AUTHENTICATED
+        except jwt.PyJWTError:
+            pass
+    return Priority.ANONYMOUS
+
+
+def request_deadline(request: Request) -> Optional[float]:
+    """Caller's remaining budget in seconds, from X-Request-Timeout"""
+    try:
+        return float(request.headers["x-request-timeout"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def send_upstream(route: ServiceRoute, method: str, path: str, params, headers: Dict[str, str], content=None,
+                        priority: Priority = Priority.ANONYMOUS, deadline: Optional[float] = None,
+                        trace: Optional[Trace] = None) -> Tuple[httpx.Response, Replica]:
+    """Send to a balanced replica; pair with close_upstream() once the body is consumed"""
+    limiter, group, client = route.limiter, route.group, route.client
+    route.active += 1
+    queue_start = time.perf_counter()
+    try:
+        await limiter.acquire(priority, deadline)
+    except Overloaded:
+        route.active -= 1
+        SHED_REQUESTS.labels(service=route.name, priority=priority.name.lower()).inc()
+        raise
+    except BaseException:
+        route.active -= 1
+        raise
+    try:
+        replica = group.acquire()
+    except BaseException:
+        route.active -= 1
+        limiter.release()
+        raise
+    extensions = None
+    if trace is not None:
+        trace.add_span("queue", queue_start, time.perf_counter(), service=route.name)
+        span = trace.start_span("upstream", kind=CLIENT, service=route.name, replica=replica.url, method=method)
+        headers = {**headers, "traceparent": trace.traceparent(span)}
+        # httpcore reports connect / request / response-header events to the recorder
+        extensions = {"trace": PhaseRecorder(trace, span)}
+    upstream_request = client.build_request(
+        method, f"{replica.url}/{path}", params=params, headers=headers, content=content, extensions=extensions
+    )
+    start = time.perf_counter()
+    try:
+        response = await client.send(upstream_request, stream=True)
+    except Exception as e:
+        if extensions is not None:
+            extensions["trace"].finish(error=True)
+        limiter.sample(time.perf_counter() - start, dropped=True)
+        group.report(replica, upstream_outcome(error=e))
+        group.release(replica)
+        limiter.release()
+        route.active -= 1
+        raise
+    except BaseException:
+        # Cancelled (client went away): no verdict on the replica
+        if extensions is not None:
+            extensions["trace"].finish(error=True)
+        group.report(replica, None)
+        group.release(replica)
+        limiter.release()
+        route.active -= 1
+        raise
+    limiter.sample(time.perf_counter() - start, dropped=response.status_code in (429, 503))
+    group.report(replica, upstream_outcome(response))
+    if extensions is not None:
+        extensions["trace"].response_started(response.status_code)
+    return response, replica
+
+
+async def close_upstream(route: ServiceRoute, response: httpx.Response, replica: Replica):
+    """Release the replica and concurrency slot held since send_upstream()"""
+    try:
+        await response.aclose()
+    finally:
+        recorder = response.request.extensions.get("trace")
+        if isinstance(recorder, PhaseRecorder):
+            recorder.finish()
+        route.group.release(replica)
+        route.limiter.release()
+        route.active -= 1
+
+
+# Failures where the request never reached (or never left) the upstream
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError)
+RETRYABLE_STATUSES = frozenset({502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def is_idempotent(route: ServiceRoute, method: str, path: str) -> bool:
+    return method in IDEMPOTENT_METHODS or any(path.startswith(prefix) for prefix in route.config["idempotent_routes"])
+
+
+async def hedged_send(route: ServiceRoute, *args, **kwargs) -> Tuple[httpx.Response, Replica]:
+    """Race a second attempt once the first outlives the service's hedge delay
+
+    The first usable response (non-5xx, or the last one standing) wins; the
+    other attempt is cancelled, or closed if it already has a response.
+    """
+    attempts = [asyncio.create_task(send_upstream(route, *args, **kwargs))]
+    winner = None
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=route.latency.hedge_delay())
+        if not done:
+            if route.retry_budget.withdraw():
+                HEDGED_REQUESTS.labels(service=route.name, outcome="sent").inc()
+                attempts.append(asyncio.create_task(send_upstream(route, *args, **kwargs)))
+            else:
+                HEDGED_REQUESTS.labels(service=route.name, outcome="budget_exhausted").inc()
+
+        pending, fallback, error = set(attempts), None, None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in sorted(done, key=attempts.index):
+                if attempt.exception() is not None:
+                    error = attempt.exception()
+                elif attempt.result()[0].status_code < 500:
+                    winner = winner or attempt
+                else:
+                    fallback = fallback or attempt
+        winner = winner or fallback
+        if winner is None:
+            raise error
+        if winner is not attempts[0]:
+            HEDGED_REQUESTS.labels(service=route.name, outcome="won").inc()
+        return winner.result()
+    finally:
+        losers = [attempt for attempt in attempts if attempt is not winner]
+        for attempt in losers:
+            attempt.cancel()
+        for result in await asyncio.gather(*losers, return_exceptions=True):
+            if isinstance(result, tuple):
+                await close_upstream(route, *result)
+
+
+async def dispatch_upstream(route: ServiceRoute, method: str, path: str, params, headers: Dict[str, str], content=None,
+                            priority: Priority = Priority.ANONYMOUS, deadline: Optional[float] = None,
+                            trace: Optional[Trace] = None) -> Tuple[httpx.Response, Replica]:
+    """send_upstream() with hedging and budgeted, jittered retries for idempotent requests
+
+    `content` must be replayable (bytes or None) when the request is idempotent.
+    """
+    if not is_idempotent(route, method, path):
+        return await send_upstream(route, method, path, params, headers, content, priority, deadline, trace)
+
+    config = route.config
+    route.retry_budget.record_request()
+    attempt = 0
+    while True:
+        attempt += 1
+        start = time.perf_counter()
+        try:
+            if config["hedge"]:
+                response, replica = await hedged_send(route, method, path, params, headers, content, priority, deadline, trace)
+            else:
+                response, replica = await send_upstream(route, method, path, params, headers, content, priority, deadline, trace)
+        except RETRYABLE_ERRORS:
+            if attempt > config["retries"]:
+                raise
+            if not route.retry_budget.withdraw():
+                RETRIES.labels(service=route.name, reason="budget_exhausted").inc()
+                raise
+            reason = "error"
+        else:
+            route.latency.observe(time.perf_counter() - start)
+            if response.status_code not in RETRYABLE_STATUSES or attempt > config["retries"]:
+                return response, replica
+            if not route.retry_budget.withdraw():
+                RETRIES.labels(service=route.name, reason="budget_exhausted").inc()
+                return response, replica
+            reason = f"status_{response.status_code}"
+            await close_upstream(route, response, replica)
+        RETRIES.labels(service=route.name, reason=reason).inc()
+        await asyncio.sleep(backoff_delay(attempt, config["retry_backoff"]))
+
+
+async def buffered_response(route: ServiceRoute, response: httpx.Response, replica: Replica) -> Response:
+    """Legacy mode: decode the upstream body and re-wrap it as JSON"""
+    try:
+        await response.aread()
+    finally:
+        await close_upstream(route, response, replica)
+    headers = forward_headers(response.headers)
+    # The body is decoded and re-serialized, so the upstream framing no longer applies
+    for key in ("content-length", "content-encoding", "content-type"):
+        headers.pop(key, None)
+    return JSONResponse(
+        status_code=response.status_code,
+        content=response.json() if response.headers.get("content-type", "").startswith("application/json") else {"data": response.text},
+        headers=headers
+    )
+
+
+def streaming_response(route: ServiceRoute, response: httpx.Response, replica: Replica,
+                       body: Optional[AsyncIterator[bytes]] = None) -> Response:
+    """Passthrough mode: relay the raw upstream body chunk by chunk"""
+    # aiter_raw() skips content decoding, so Content-Encoding/Length stay valid
+    return StreamingResponse(
+        response.aiter_raw() if body is None else body,
+        status_code=response.status_code,
+        headers=forward_headers(response.headers),
+        background=BackgroundTask(close_upstream, route, response, replica),
+    )
+
+
+# Response cache (ServiceRoute.cache, per opted-in service) and single-flight for identical misses
+cache_flights = SingleFlight()
+background_tasks: set = set()
+
+
+def is_cacheable_request(request: Request) -> bool:
+    """Only anonymous GETs are shared between clients"""
+    return (
+        request.method == "GET"
+        and "authorization" not in request.headers
+        and "cookie" not in request.headers
+        and "no-store" not in request.headers.get("cache-control", "")
+    )
+
+
+def cache_key(service: str, path: str, request: Request) -> str:
+    # Bodies are stored still encoded, so the negotiated encoding is part of the key
+    return f"{service}/{path}?{request.url.query}|{request.headers.get('accept-encoding', '')}"
+
+
+@dataclass
+class Passthrough:
+    """An upstream response too large to cache, left open for its caller to stream"""
+    response: httpx.Response
+    replica: Replica
+    # Chunks already read before the size limit was passed, then the rest of the body
+    head: List[bytes]
+    rest: AsyncIterator[bytes]
+
+    async def body(self):
+        for chunk in self.head:
+            yield chunk
+        async for chunk in self.rest:
+            yield chunk
+
+
+def declared_length(response: httpx.Response) -> Optional[int]:
+    try:
+        return int(response.headers["content-length"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def fetch_for_cache(route: ServiceRoute, path: str, params, headers: Dict[str, str], key: str):
+    """Fetch (or revalidate) one cache entry from the upstream
+
+    Returns a CachedResponse, or a still-open Passthrough once the body is known
+    to exceed the cache's per-entry limit, so it is never buffered in full.
+    """
+    cache = route.cache
+    stale_seconds = route.config["cache_stale_seconds"]
+    previous = cache.get(key)
+    if previous is not None and previous.etag:
+        headers = {**headers, "if-none-match": previous.etag}
+
+    response, replica = await dispatch_upstream(route, "GET", path, params, headers)
+    passthrough = None
+    try:
+        if response.status_code == 304 and previous is not None:
+            previous.refresh(parse_cache_control(response.headers.get("cache-control", "")), stale_seconds)
+            CACHE_REQUESTS.labels(service=route.name, result="revalidated").inc()
+            return previous
+        limit = cache.max_entry_bytes
+        chunks: List[bytes] = []
+        size = 0
+        raw = response.aiter_raw()
+        length = declared_length(response)
+        if length is None or length <= limit:
+            async for chunk in raw:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > limit:
+                    break
+        if size > limit or (length or 0) > limit:
+            if response.status_code == 200:
+                cache.discard(key)
+            passthrough = Passthrough(response, replica, chunks, raw)
+            return passthrough
+        body = b"".join(chunks)
+    finally:
+        if passthrough is None:
+            await close_upstream(route, response, replica)
+
+    entry = build_entry(response.status_code, list(forward_headers(response.headers).items()), body, stale_seconds)
+    if is_storable(entry):
+        cache.put(key, entry)
+    elif entry.status_code == 200:
+        cache.discard(key)
+    return entry
+
+
+async def close_unclaimed(route: ServiceRoute, key: str, fetch):
+    """Wait out a cache fetch nobody will serve, closing the upstream if it came back uncacheable"""
+    entry, _ = await cache_flights.do(key, fetch)
+    if isinstance(entry, Passthrough):
+        await close_upstream(route, entry.response, entry.replica)
+
+
+def run_in_background(coro):
+    """Fire-and-forget, keeping a reference so the task is not garbage collected"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(lambda done: background_tasks.discard(done) or done.cancelled() or done.exception())
+
+
+def cached_to_response(entry: CachedResponse, cache_status: str, request: Request) -> Response:
+    if entry.etag and entry.status_code == 200 and request.headers.get("if-none-match") == entry.etag:
+        response = Response(status_code=304, headers={"ETag": entry.etag})
+    else:
+        response = Response(content=entry.body, status_code=entry.status_code, headers=dict(entry.headers))
+    response.headers["Age"] = str(int(entry.age(time.monotonic())))
+    response.headers["X-Cache"] = cache_status
+    return response
+
+
+async def cached_response(route: ServiceRoute, path: str, request: Request) -> Response:
+    """Serve from cache; stale entries revalidate in the background"""
+    key = cache_key(route.name, path, request)
+    headers = forward_headers(request.headers)
+    for conditional in ("if-none-match", "if-modified-since"):
+        headers.pop(conditional, None)
+    fetch = lambda: fetch_for_cache(route, path, request.query_params, headers, key)
+
+    now = time.monotonic()
+    entry = route.cache.get(key)
+    if entry is not None and entry.is_fresh(now):
+        result = "hit"
+    elif entry is not None and entry.is_servable_stale(now):
+        result = "stale"
+        if not cache_flights.in_flight(key):
+            run_in_background(close_unclaimed(route, key, fetch))
+    else:
+        leader = not cache_flights.in_flight(key)
+        try:
+            entry, shared = await cache_flights.do(key, fetch)
+        except asyncio.CancelledError:
+            # The fetch outlives this request; an uncacheable response it returns is ours to close
+            if leader:
+                run_in_background(close_unclaimed(route, key, fetch))
+            raise
+        if isinstance(entry, Passthrough):
+            CACHE_REQUESTS.labels(service=route.name, result="too_large").inc()
+            if shared:
+                # The leader streams its own response; waiters fetch theirs uncached
+                response, replica = await dispatch_upstream(
+                    route, "GET", path, request.query_params, forward_headers(request.headers)
+                )
+                passthrough = streaming_response(route, response, replica)
+            else:
+                passthrough = streaming_response(route, entry.response, entry.replica, entry.body())
+            passthrough.headers["X-Cache"] = "BYPASS"
+            return passthrough
+        result = "coalesced" if shared else "miss"
+
+    CACHE_REQUESTS.labels(service=route.name, result=result).inc()
+    return cached_to_response(entry, result.upper(), request)
+
+
 # Proxy routes
 @app.api_route("/api/{service}/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy_request(service: str, path: str, request: Request):
     """Proxy requests to backend services"""
-    if service not in SERVICES:
-        ERROR_COUNT.labels(endpoint=service, error_type="service_not_found").inc()
+    route = routes.get(service)
+    if route is None:
+        count_error(service, "service_not_found")
         raise HTTPException(status_code=404, detail=f"Service '{service}' not found")
     
-    target_url = f"{SERVICES[service]}/{path}"
-    
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Forward the request
-            response = await client.request(
-                method=request.method,
-                url=target_url,
-                headers=dict(request.headers),
-                content=await request.body()
-            )
-            
-            return JSONResponse(
-                status_code=response.status_code,
-                content=response.json() if response.headers.get("content-type", "").startswith("application/json") else {"data": response.text},
-                headers=dict(response.headers)
-            )
+        if route.cache is not None and is_cacheable_request(request):
+            return await cached_response(route, path, request)
+        
+        content = request_body(request)
+        if content is not None and is_idempotent(route, request.method, path):
+            # Retries and hedges resend the body, so it has to be buffered
+            content = await request.body()
+        # Forward the request to a balanced replica over the service's pooled client
+        response, replica = await dispatch_upstream(
+            route, request.method, path, request.query_params,
+            forward_headers(request.headers), content,
+            priority=request_priority(request, path), deadline=request_deadline(request),
+            trace=request.state.trace,
+        )
+        if route.config["stream"]:
+            return streaming_response(route, response, replica)
+        return await buffered_response(route, response, replica)
+    except Overloaded as e:
+        count_error(service, "overloaded")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    except UpstreamUnavailable as e:
+        count_error(service, "unavailable")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
     except httpx.TimeoutException:
-        ERROR_COUNT.labels(endpoint=service, error_type="timeout").inc()
+        count_error(service, "timeout")
         raise HTTPException(status_code=504, detail="Gateway timeout")
+    except httpx.TransportError as e:
+        count_error(service, "upstream_unreachable")
+        raise HTTPException(status_code=502, detail=f"Bad gateway: {e}")
     except Exception as e:
-        ERROR_COUNT.labels(endpoint=service, error_type="internal_error").inc()
+        count_error(service, "internal_error")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Batch / fan-out
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "10"))
+BATCH_MAX_ITEM_BYTES = int(os.getenv("BATCH_MAX_ITEM_BYTES", str(1024 * 1024)))
+PROXY_METHODS = {"GET", "POST", "PUT", "DELETE", "PATCH"}
+
+
+class SubRequest(BaseModel):
+    id: Optional[str] = None
+    service: str
+    method: str = "GET"
+    path: str = ""
+    query: Dict[str, str] = {}
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+    timeout: Optional[float] = Field(default=None, gt=0, description="Per-item deadline in seconds")
+
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest] = Field(min_length=1)
+    concurrency: int = Field(default=BATCH_MAX_CONCURRENCY, ge=1)
+    timeout: float = Field(default=10.0, gt=0, description="Default per-item deadline in seconds")
+    stream: bool = Field(default=False, description="Return NDJSON lines as items finish")
+
+
+class BatchItemError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+async def read_limited(response: httpx.Response, limit: int) -> bytes:
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        body.extend(chunk)
+        if len(body) > limit:
+            raise BatchItemError(502, f"Response exceeds {limit} bytes")
+    return bytes(body)
+
+
+async def run_sub_request(item: SubRequest, base_headers: Dict[str, str], client_ip: str, priority: Priority,
+                          trace: Optional[Trace] = None) -> dict:
+    """Proxy one batch item; the outcome is always reported, never raised"""
+    start = time.perf_counter()
+    result: Dict[str, Any] = {"id": item.id, "service": item.service}
+    try:
+        route = routes.get(item.service)
+        if route is None:
+            raise BatchItemError(404, f"Service '{item.service}' not found")
+        method = item.method.upper()
+        if method not in PROXY_METHODS:
+            raise BatchItemError(405, f"Method '{item.method}' not allowed")
+        path = item.path.lstrip("/")
+        # Each item is charged like a direct call so batching cannot bypass limits
+        allowed, _ = await rate_limiter.check(client_ip, f"/api/{item.service}/{path}")
+        if not allowed:
+            raise BatchItemError(429, "Rate limit exceeded")
+
+        headers = {**base_headers, **item.headers}
+        content = None
+        if item.body is not None:
+            content = json.dumps(item.body).encode()
+            headers["content-type"] = "application/json"
+        response, replica = await dispatch_upstream(route, method, path, item.query, headers, content, priority=priority, trace=trace)
+        try:
+            body = await read_limited(response, BATCH_MAX_ITEM_BYTES)
+        finally:
+            await close_upstream(route, response, replica)
+
+        result["status"] = response.status_code
+        if response.headers.get("content-type", "").startswith("application/json") and body:
+            result["body"] = json.loads(body)
+        else:
+            result["body"] = body.decode(response.encoding or "utf-8", errors="replace")
+        outcome = "ok" if response.status_code < 400 else "upstream_error"
+    except BatchItemError as e:
+        result.update(status=e.status_code, error=str(e))
+        outcome = "rejected"
+    except Overloaded as e:
+        result.update(status=503, error=str(e), retry_after=math.ceil(e.retry_after))
+        outcome = "overloaded"
+    except UpstreamUnavailable as e:
+        result.update(status=503, error=str(e))
+        outcome = "unavailable"
+    except httpx.TimeoutException:
+        result.update(status=504, error="Gateway timeout")
+        outcome = "timeout"
+    except Exception as e:
+        result.update(status=502, error=str(e))
+        outcome = "error"
+
+    BATCH_ITEMS.labels(service=item.service if item.service in routes else "unknown", outcome=outcome).inc()
+    result["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+async def run_with_deadline(index: int, item: SubRequest, batch: BatchRequest, semaphore: asyncio.Semaphore,
+                            base_headers: Dict[str, str], client_ip: str, priority: Priority,
+                            trace: Optional[Trace] = None) -> dict:
+    deadline = item.timeout or batch.timeout
+    start = time.perf_counter()
+    try:
+        # The deadline covers time spent waiting for a concurrency slot
+        async with asyncio.timeout(deadline):
+            async with semaphore:
+                result = await run_sub_request(item, base_headers, client_ip, priority, trace)
+    except TimeoutError:
+        BATCH_ITEMS.labels(service=item.service if item.service in routes else "unknown", outcome="deadline").inc()
+        result = {
+            "id": item.id, "service": item.service, "status": 504,
+            "error": f"Deadline of {deadline}s exceeded",
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+    result["index"] = index
+    return result
+
+
+@app.post("/batch")
+async def batch(batch: BatchRequest, request: Request):
+    """Fan out sub-requests concurrently; failures are reported per item"""
+    if len(batch.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+
+    semaphore = asyncio.Semaphore(min(batch.concurrency, BATCH_MAX_CONCURRENCY))
+    # Pass caller credentials through; bodies are decoded here, so drop framing headers
+    base_headers = {
+        key: value for key, value in forward_headers(request.headers).items()
+        if key.lower() not in ("content-length", "content-type", "accept-encoding")
+    }
+    # Batch items never count as health probes
+    priority = max(request_priority(request, "batch"), Priority.AUTHENTICATED)
+    tasks = [
+        asyncio.create_task(run_with_deadline(
+            index, item, batch, semaphore, base_headers, request.client.host, priority, request.state.trace
+        ))
+        for index, item in enumerate(batch.requests)
+    ]
+
+    if not batch.stream:
+        results = await asyncio.gather(*tasks)
+        failed = sum(1 for result in results if "error" in result or result["status"] >= 400)
+        return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+    async def ndjson():
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished).encode() + b"\n"
+        finally:
+            # Client went away mid-stream: stop the remaining sub-requests
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8080, log_level="info")
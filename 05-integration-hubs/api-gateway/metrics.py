@@ -0,0 +1,118 @@
+"""
+Prometheus instrumentation for the API Gateway
+Bounded label cardinality, cached label children and multiprocess-safe exposition
+"""
+
+import os
+from typing import Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+# Set PROMETHEUS_MULTIPROC_DIR (to an empty directory) when running several
+# uvicorn workers; every worker then writes its samples there for /metrics to merge
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+OVERFLOW = "__overflow__"
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"})
+
+REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP Requests', ['method', 'route', 'service', 'status'])
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP Request Duration', ['method', 'route', 'service'])
+ERROR_COUNT = Counter('http_errors_total', 'Total HTTP Errors', ['endpoint', 'error_type'])
+UPSTREAM_POOL = Gauge('gateway_upstream_pool_connections', 'Upstream connection pool state', ['service', 'state'], multiprocess_mode='livesum')
+CACHE_REQUESTS = Counter('gateway_cache_requests_total', 'Proxy cache lookups by result', ['service', 'result'])
+CACHE_BYTES = Gauge('gateway_cache_bytes', 'Bytes held in the proxy response cache', ['service'], multiprocess_mode='livesum')
+BATCH_ITEMS = Counter('gateway_batch_items_total', 'Batch sub-requests by outcome', ['service', 'outcome'])
+UPSTREAM_REPLICAS = Gauge('gateway_upstream_replicas', 'Upstream replicas by health state', ['service', 'state'], multiprocess_mode='livemax')
+CIRCUIT_OPEN = Gauge('gateway_circuit_open', 'Whether the service circuit breaker is open (1) or half-open (0.5)', ['service'], multiprocess_mode='livemax')
+CONCURRENCY = Gauge('gateway_concurrency', 'Adaptive concurrency limit, in-flight and queued requests per service', ['service', 'state'], multiprocess_mode='livesum')
+SHED_REQUESTS = Counter('gateway_shed_requests_total', 'Requests shed by the concurrency limiter', ['service', 'priority'])
+RETRIES = Counter('gateway_retries_total', 'Upstream retries of idempotent requests by reason', ['service', 'reason'])
+HEDGED_REQUESTS = Counter('gateway_hedged_requests_total', 'Hedged upstream requests by outcome', ['service', 'outcome'])
+
+
+class LabelLimiter:
+    """Admit at most `max_values` distinct label values; later ones share an overflow bucket"""
+
+    def __init__(self, max_values: int):
+        self.max_values = max_values
+        self._seen = set()
+
+    def __call__(self, value: str) -> str:
+        if value in self._seen:
+            return value
+        if len(self._seen) >= self.max_values:
+            return OVERFLOW
+        self._seen.add(value)
+        return value
+
+
+class RequestMetrics:
+    """Per-request counter/histogram updates with the labelled children cached
+
+    `labels()` takes a lock and builds a key on every call; caching the
+    children keyed by the bounded label tuple leaves two dict lookups and
+    the sample updates on the hot path.
+    """
+
+    def __init__(self, max_routes: int = 100, max_services: int = 64):
+        self._routes = LabelLimiter(max_routes)
+        self._services = LabelLimiter(max_services)
+        self._children: Dict[Tuple[str, str, str, int], Tuple] = {}
+
+    def observe(self, method: str, route: str, service: str, status: int, duration: float):
+        key = (
+            method if method in HTTP_METHODS else "OTHER",
+            self._routes(route),
+            self._services(service),
+            status,
+        )
+        children = self._children.get(key)
+        if children is None:
+            method, route, service, _ = key
+            children = (
+                REQUEST_COUNT.labels(method=method, route=route, service=service, status=str(status)),
+                REQUEST_DURATION.labels(method=method, route=route, service=service),
+            )
+            self._children[key] = children
+        children[0].inc()
+        children[1].observe(duration)
+
+
+# Error labels can carry client input (unknown service names), so cap them too
+error_endpoints = LabelLimiter(64)
+
+
+def count_error(endpoint: str, error_type: str):
+    ERROR_COUNT.labels(endpoint=error_endpoints(endpoint), error_type=error_type).inc()
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposition for /metrics, merged across workers in multiprocess mode"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+if __name__ == "__main__":
+    # Measure the per-request instrumentation cost: python metrics.py
+    import timeit
+
+    request_metrics = RequestMetrics()
+    runs = 200_000
+    cost = timeit.timeit(
+        lambda: request_metrics.observe("GET", "/api/{service}/{path:path}", "apex", 200, 0.012),
+        number=runs,
+    )
+    uncached = timeit.timeit(
+        lambda: (
+            REQUEST_COUNT.labels(method="GET", route="/api/{service}/{path:path}", service="apex", status="200").inc(),
+            REQUEST_DURATION.labels(method="GET", route="/api/{service}/{path:path}", service="apex").observe(0.012),
+        ),
+        number=runs,
+    )
+    print(f"RequestMetrics.observe: {cost / runs * 1e6:.2f} µs/request")
+    print(f"labels() on every call: {uncached / runs * 1e6:.2f} µs/request")
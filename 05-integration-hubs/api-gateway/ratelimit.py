@@ -0,0 +1,190 @@
+"""
+Rate limiting for the API Gateway
+Token buckets with O(1) per-request cost, behind a pluggable state backend
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """`limit` requests per `window` seconds, enforced as a token bucket"""
+    limit: int
+    window: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimit":
+        """Parse a '<limit>/<window seconds>' spec such as '100/60'"""
+        limit, _, window = spec.partition("/")
+        return cls(limit=int(limit), window=float(window or 60))
+
+
+class RateLimitBackend:
+    """Storage for bucket state; acquire() takes one token from `key`"""
+
+    async def acquire(self, key: str, rule: RateLimit) -> Tuple[bool, float]:
+        """Return (allowed, seconds until a token is available)"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process buckets kept in LRU order so idle keys can be evicted cheaply"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> [tokens, last_refill, expires_at]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def acquire(self, key: str, rule: RateLimit) -> Tuple[bool, float]:
+        now = time.monotonic()
+        rate = rule.limit / rule.window
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = float(rule.limit)
+        else:
+            tokens = min(rule.limit, bucket[0] + (now - bucket[1]) * rate)
+            self._buckets.move_to_end(key)
+
+        if tokens >= 1:
+            allowed, retry_after = True, 0.0
+            tokens -= 1
+        else:
+            allowed, retry_after = False, (1 - tokens) / rate
+
+        # A bucket left idle for a full window is back at capacity, so it can
+        # be dropped without changing any future decision
+        self._buckets[key] = [tokens, now, now + rule.window]
+        self._evict(now)
+        return allowed, retry_after
+
+    def _evict(self, now: float):
+        """Drop expired buckets from the cold end; amortized O(1)"""
+        buckets = self._buckets
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if bucket[2] > now and len(buckets) <= self.max_keys:
+                break
+            buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# Token bucket evaluated atomically server-side; uses the server clock so every
+# gateway worker sees the same time. Keys expire once the bucket would be full.
+TOKEN_BUCKET_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window_ms = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = limit
+else
+    tokens = math.min(limit, tokens + (now - ts) * limit / window_ms)
+end
+local allowed = 0
+local retry_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_ms = math.ceil((1 - tokens) * window_ms / limit)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(window_ms))
+return {allowed, retry_ms}
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """Buckets shared by every gateway worker through a Redis-protocol store"""
+
+    def __init__(self, url: str, prefix: str = "gateway:ratelimit:"):
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self, key: str, rule: RateLimit) -> Tuple[bool, float]:
+        try:
+            allowed, retry_ms = await self._script(
+                keys=[self.prefix + key],
+                args=[rule.limit, int(rule.window * 1000)],
+            )
+        except Exception as e:
+            # Fail open: a store outage should not take the gateway down with it
+            logger.warning(f"Rate limit backend unavailable, allowing request: {e}")
+            return True, 0.0
+        return bool(allowed), retry_ms / 1000
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class RateLimiter:
+    """Resolves the most specific rule for a request and charges its bucket
+
+    Precedence: longest matching route prefix, then the proxied service,
+    then the gateway-wide default. Buckets are keyed per client and rule scope.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        default: RateLimit,
+        services: Optional[Dict[str, RateLimit]] = None,
+        routes: Optional[Dict[str, RateLimit]] = None,
+    ):
+        self.backend = backend
+        self.default = default
+        self.services = services or {}
+        self.routes = sorted((routes or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def resolve(self, path: str) -> Tuple[str, RateLimit]:
+        """Return (scope, rule) for a request path"""
+        for prefix, rule in self.routes:
+            if path.startswith(prefix):
+                return f"route:{prefix}", rule
+        if path.startswith("/api/"):
+            service = path[5:].split("/", 1)[0]
+            rule = self.services.get(service)
+            if rule is not None:
+                return f"service:{service}", rule
+        return "global", self.default
+
+    async def check(self, client_id: str, path: str) -> Tuple[bool, float]:
+        scope, rule = self.resolve(path)
+        return await self.backend.acquire(f"{scope}:{client_id}", rule)
+
+    async def close(self):
+        await self.backend.close()
+
+
+def parse_rules(spec: str) -> Dict[str, RateLimit]:
+    """Parse 'prefix=limit/window,...' into a rule map"""
+    rules = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, rule = item.partition("=")
+        rules[prefix.strip()] = RateLimit.parse(rule.strip())
+    return rules
+
+
+def build_backend(kind: str, redis_url: str) -> RateLimitBackend:
+    if kind == "redis":
+        return RedisBackend(redis_url)
+    if kind == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown rate limit backend: {kind}")
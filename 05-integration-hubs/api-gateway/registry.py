@@ -0,0 +1,321 @@
+"""
+Service registry for the API Gateway
+Entries from environment variables or a registry file (native or SYSTEMS-INVENTORY.json),
+validated before use and reloaded when the file changes or on SIGHUP
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import signal
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from ratelimit import RateLimit
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "timeout": 30.0,
+    "connect_timeout": 3.0,
+    "lb_strategy": "p2c",
+    "health_path": "/health",
+    "health_interval": 10.0,
+    "health_timeout": 2.0,
+    "ejection_failures": 5,
+    "ejection_time": 30.0,
+    "breaker_failures": 5,
+    "breaker_reset": 30.0,
+    "concurrency_initial": 20,
+    "concurrency_min": 2,
+    "concurrency_max": 200,
+    "queue_size": 50,
+    "queue_timeout": 1.0,
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,
+    "http2": False,
+    "stream": True,
+    "rate_limit": None,
+    "cache": False,
+    "cache_max_bytes": 64 * 1024 * 1024,
+    "cache_max_entry_bytes": 1024 * 1024,
+    "cache_stale_seconds": 30,
+    "retries": 2,
+    "retry_backoff": 0.05,
+    "retry_budget_ratio": 0.1,
+    "retry_budget_min": 10.0,
+    "hedge": False,
+    "hedge_percentile": 95.0,
+    "hedge_min_delay": 0.01,
+    "idempotent_routes": [],
+}
+
+SERVICE_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+LB_STRATEGIES = ("p2c", "least_outstanding")
+
+
+class RegistryError(ValueError):
+    """A registry source failed validation; the running registry is left as it was"""
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+def service_entry(env_prefix: str, default_url: str, **overrides) -> dict:
+    """Build a registry entry; <PREFIX>_* env vars override the pool settings"""
+    defaults = {**DEFAULTS, **overrides}
+    url = os.getenv(f"{env_prefix}_URL", default_url)
+    return {
+        "url": url,
+        # Comma-separated replica list; a single URL is a one-replica group
+        "urls": [u.strip() for u in os.getenv(f"{env_prefix}_URLS", url).split(",") if u.strip()],
+        "timeout": float(os.getenv(f"{env_prefix}_TIMEOUT", defaults["timeout"])),
+        "connect_timeout": float(os.getenv(f"{env_prefix}_CONNECT_TIMEOUT", defaults["connect_timeout"])),
+        # "p2c" (power of two choices) or "least_outstanding"
+        "lb_strategy": os.getenv(f"{env_prefix}_LB_STRATEGY", defaults["lb_strategy"]),
+        # Active health checks; an interval of 0 disables them
+        "health_path": os.getenv(f"{env_prefix}_HEALTH_PATH", defaults["health_path"]),
+        "health_interval": float(os.getenv(f"{env_prefix}_HEALTH_INTERVAL", defaults["health_interval"])),
+        "health_timeout": float(os.getenv(f"{env_prefix}_HEALTH_TIMEOUT", defaults["health_timeout"])),
+        # Passive outlier ejection after consecutive failures on one replica
+        "ejection_failures": int(os.getenv(f"{env_prefix}_EJECTION_FAILURES", defaults["ejection_failures"])),
+        "ejection_time": float(os.getenv(f"{env_prefix}_EJECTION_TIME", defaults["ejection_time"])),
+        # Service-wide circuit breaker
+        "breaker_failures": int(os.getenv(f"{env_prefix}_BREAKER_FAILURES", defaults["breaker_failures"])),
+        "breaker_reset": float(os.getenv(f"{env_prefix}_BREAKER_RESET", defaults["breaker_reset"])),
+        # Adaptive in-flight limit (AIMD on latency) and its bounded wait queue
+        "concurrency_initial": int(os.getenv(f"{env_prefix}_CONCURRENCY", defaults["concurrency_initial"])),
+        "concurrency_min": int(os.getenv(f"{env_prefix}_CONCURRENCY_MIN", defaults["concurrency_min"])),
+        "concurrency_max": int(os.getenv(f"{env_prefix}_CONCURRENCY_MAX", defaults["concurrency_max"])),
+        "queue_size": int(os.getenv(f"{env_prefix}_QUEUE_SIZE", defaults["queue_size"])),
+        "queue_timeout": float(os.getenv(f"{env_prefix}_QUEUE_TIMEOUT", defaults["queue_timeout"])),
+        "max_connections": int(os.getenv(f"{env_prefix}_MAX_CONNECTIONS", defaults["max_connections"])),
+        "max_keepalive_connections": int(os.getenv(f"{env_prefix}_MAX_KEEPALIVE", defaults["max_keepalive_connections"])),
+        "keepalive_expiry": float(os.getenv(f"{env_prefix}_KEEPALIVE_EXPIRY", defaults["keepalive_expiry"])),
+        "http2": _env_flag(f"{env_prefix}_HTTP2", defaults["http2"]),
+        # Streaming passthrough; set <PREFIX>_STREAM=false for the legacy JSON envelope
+        "stream": _env_flag(f"{env_prefix}_STREAM", defaults["stream"]),
+        # Per-client limit for this service as '<requests>/<seconds>'; None uses the default
+        "rate_limit": os.getenv(f"{env_prefix}_RATE_LIMIT", defaults["rate_limit"]),
+        # Opt-in GET cache; cached responses are buffered, so keep payloads modest
+        "cache": _env_flag(f"{env_prefix}_CACHE", defaults["cache"]),
+        "cache_max_bytes": int(os.getenv(f"{env_prefix}_CACHE_BYTES", defaults["cache_max_bytes"])),
+        "cache_max_entry_bytes": int(os.getenv(f"{env_prefix}_CACHE_ENTRY_BYTES", defaults["cache_max_entry_bytes"])),
+        # Used when the upstream sends no stale-while-revalidate directive
+        "cache_stale_seconds": int(os.getenv(f"{env_prefix}_CACHE_STALE", defaults["cache_stale_seconds"])),
+        # Retries for idempotent requests (GET/HEAD and idempotent_routes), drawn from a
+        # per-service budget of retry_budget_ratio x recent requests + retry_budget_min/s
+        "retries": int(os.getenv(f"{env_prefix}_RETRIES", defaults["retries"])),
+        "retry_backoff": float(os.getenv(f"{env_prefix}_RETRY_BACKOFF", defaults["retry_backoff"])),
+        "retry_budget_ratio": float(os.getenv(f"{env_prefix}_RETRY_BUDGET_RATIO", defaults["retry_budget_ratio"])),
+        "retry_budget_min": float(os.getenv(f"{env_prefix}_RETRY_BUDGET_MIN", defaults["retry_budget_min"])),
+        # Hedging: a second attempt once the first is slower than this latency percentile
+        "hedge": _env_flag(f"{env_prefix}_HEDGE", defaults["hedge"]),
+        "hedge_percentile": float(os.getenv(f"{env_prefix}_HEDGE_PERCENTILE", defaults["hedge_percentile"])),
+        "hedge_min_delay": float(os.getenv(f"{env_prefix}_HEDGE_MIN_DELAY", defaults["hedge_min_delay"])),
+        # Path prefixes (within the service) whose every method is safe to repeat
+        "idempotent_routes": [
+            r.strip() for r in os.getenv(f"{env_prefix}_IDEMPOTENT_ROUTES", ",".join(defaults["idempotent_routes"])).split(",")
+            if r.strip()
+        ],
+    }
+
+
+def builtin_services() -> Dict[str, dict]:
+    """The built-in backends, configured through <PREFIX>_* environment variables"""
+    services = {
+        "autohelix": service_entry("AUTOHELIX", "http://autohelix:8000"),
+        "apex": service_entry("APEX", "http://apex:8001"),
+        "mlops": service_entry("MLOPS", "http://mlops:8100"),
+        "nwu": service_entry("NWU", "http://nwu:8200"),
+        "ai-ops": service_entry("AIOPS", "http://ai-ops:8300"),
+        "tree-of-life": service_entry("TOL", "http://tree-of-life:3000"),
+    }
+    return {name: validate_entry(name, entry) for name, entry in services.items()}
+
+
+def _coerce(name: str, key: str, value, expected):
+    if expected is bool:
+        if not isinstance(value, bool):
+            raise RegistryError(f"{name}.{key}: expected true/false, got {value!r}")
+        return value
+    if expected is int:
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise RegistryError(f"{name}.{key}: expected an integer, got {value!r}")
+        return value
+    if expected is float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise RegistryError(f"{name}.{key}: expected a number, got {value!r}")
+        return float(value)
+    if expected is list:
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise RegistryError(f"{name}.{key}: expected a list of strings, got {value!r}")
+        return list(value)
+    if not isinstance(value, str):
+        raise RegistryError(f"{name}.{key}: expected a string, got {value!r}")
+    return value
+
+
+def validate_entry(name: str, raw: dict, defaults: Optional[dict] = None) -> dict:
+    """Fill in defaults and check one entry; raises RegistryError on the first problem"""
+    if not SERVICE_NAME.match(name):
+        raise RegistryError(f"Invalid service name {name!r}")
+    if not isinstance(raw, dict):
+        raise RegistryError(f"{name}: entry must be an object")
+    unknown = set(raw) - set(DEFAULTS) - {"url", "urls", "name"}
+    if unknown:
+        raise RegistryError(f"{name}: unknown keys {sorted(unknown)}")
+
+    base = {**DEFAULTS, **(defaults or {})}
+    entry = {}
+    for key, default in DEFAULTS.items():
+        value = raw.get(key, base[key])
+        if key == "rate_limit":
+            if value is not None:
+                try:
+                    RateLimit.parse(value)
+                except (TypeError, ValueError, AttributeError):
+                    raise RegistryError(f"{name}.rate_limit: expected '<requests>/<seconds>', got {value!r}")
+            entry[key] = value
+        else:
+            entry[key] = _coerce(name, key, value, type(default))
+
+    urls = raw.get("urls") or ([raw["url"]] if raw.get("url") else [])
+    if isinstance(urls, str):
+        urls = [u.strip() for u in urls.split(",") if u.strip()]
+    if not urls:
+        raise RegistryError(f"{name}: needs 'url' or 'urls'")
+    for url in urls:
+        parts = urlsplit(url) if isinstance(url, str) else None
+        if parts is None or parts.scheme not in ("http", "https") or not parts.netloc:
+            raise RegistryError(f"{name}: invalid upstream URL {url!r}")
+    entry["urls"] = [url.rstrip("/") for url in urls]
+    entry["url"] = entry["urls"][0]
+
+    if entry["lb_strategy"] not in LB_STRATEGIES:
+        raise RegistryError(f"{name}.lb_strategy: expected one of {LB_STRATEGIES}")
+    for key in ("timeout", "connect_timeout", "health_timeout", "queue_timeout"):
+        if entry[key] <= 0:
+            raise RegistryError(f"{name}.{key}: must be positive")
+    for key in ("health_interval", "ejection_time", "breaker_reset", "keepalive_expiry",
+                "queue_size", "max_keepalive_connections", "cache_stale_seconds",
+                "retries", "retry_backoff", "retry_budget_ratio", "retry_budget_min", "hedge_min_delay"):
+        if entry[key] < 0:
+            raise RegistryError(f"{name}.{key}: must not be negative")
+    for key in ("ejection_failures", "breaker_failures", "max_connections", "cache_max_bytes", "cache_max_entry_bytes"):
+        if entry[key] < 1:
+            raise RegistryError(f"{name}.{key}: must be at least 1")
+    if not 1 <= entry["concurrency_min"] <= entry["concurrency_initial"] <= entry["concurrency_max"]:
+        raise RegistryError(f"{name}: need 1 <= concurrency_min <= concurrency_initial <= concurrency_max")
+    if not 0 < entry["hedge_percentile"] < 100:
+        raise RegistryError(f"{name}.hedge_percentile: must be between 0 and 100")
+    entry["idempotent_routes"] = [route.lstrip("/") for route in entry["idempotent_routes"]]
+    if entry["max_keepalive_connections"] > entry["max_connections"]:
+        raise RegistryError(f"{name}: max_keepalive_connections exceeds max_connections")
+    return entry
+
+
+def compile_registry(document: dict) -> Dict[str, dict]:
+    """Validate a whole registry document into name -> entry
+
+    Two layouts are accepted: {"defaults": {...}, "services": {name: entry}}, or
+    SYSTEMS-INVENTORY.json, where every system carrying a "gateway" block is
+    routed (under its block's "name", else the system key).
+    """
+    if not isinstance(document, dict):
+        raise RegistryError("Registry document must be a JSON object")
+    defaults = document.get("defaults") or {}
+    if "services" in document:
+        raw_entries = list((document["services"] or {}).items())
+    elif "categories" in document:
+        raw_entries = [
+            (system.get("gateway", {}).get("name", key), system["gateway"])
+            for category in document["categories"].values()
+            for key, system in category.items()
+            if isinstance(system, dict) and "gateway" in system
+        ]
+    else:
+        raise RegistryError("Registry document needs 'services' or 'categories'")
+
+    services: Dict[str, dict] = {}
+    for name, raw in raw_entries:
+        if name in services:
+            raise RegistryError(f"Duplicate service {name!r}")
+        services[name] = validate_entry(name, raw, defaults)
+    if not services:
+        raise RegistryError("Registry defines no services")
+    return services
+
+
+def load_registry(path: str) -> Dict[str, dict]:
+    try:
+        with open(path) as f:
+            document = json.load(f)
+    except json.JSONDecodeError as e:
+        raise RegistryError(f"{path}: {e}")
+    return compile_registry(document)
+
+
+class RegistryWatcher:
+    """Re-read the registry file when it changes or the process gets SIGHUP
+
+    `apply` is called with the validated registry; a file that fails to load,
+    validate or apply is logged and skipped, leaving the running registry in place.
+    """
+
+    def __init__(self, path: str, apply: Callable[[Dict[str, dict]], None], interval: float = 2.0):
+        self.path = path
+        self.apply = apply
+        self.interval = interval
+        self._signature = self._stat()
+        self._hangup = asyncio.Event()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        # Inode too, so an atomic rename onto the path counts as a change
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def reload(self) -> bool:
+        try:
+            services = load_registry(self.path)
+        except (OSError, RegistryError) as e:
+            logger.error(f"Registry reload rejected, keeping current services: {e}")
+            return False
+        try:
+            self.apply(services)
+        except Exception as e:
+            logger.error(f"Registry reload rejected, keeping current services: {e}")
+            return False
+        logger.info(f"Registry reloaded from {self.path}: {len(services)} services")
+        return True
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self._hangup.set)
+        except (NotImplementedError, RuntimeError, AttributeError):
+            pass  # no SIGHUP here (Windows, non-main thread); file polling still works
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._hangup.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                forced = self._hangup.is_set()
+                self._hangup.clear()
+                signature = self._stat()
+                if forced or (signature is not None and signature != self._signature):
+                    self._signature = signature
+                    self.reload()
+        finally:
+            try:
+                loop.remove_signal_handler(signal.SIGHUP)
+            except (NotImplementedError, RuntimeError, AttributeError):
+                pass
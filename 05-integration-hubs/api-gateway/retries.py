@@ -0,0 +1,84 @@
+"""
+Retry and hedging policy for the API Gateway
+Per-service retry budgets, jittered backoff and a recent-latency percentile for hedge delays
+"""
+
+import random
+import time
+from collections import deque
+from typing import Deque, List
+
+
+class RetryBudget:
+    """Allow retries (and hedges) up to `ratio` of recent requests, plus a small floor
+
+    Counts are kept in one-second buckets over `window` seconds, so when a
+    backend fails outright the extra load it sees is bounded by the ratio
+    instead of multiplying with the attempt count.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 10.0, window: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = int(max(window, 1))
+        # [second, requests, retries]
+        self._buckets: Deque[List[int]] = deque()
+        self.requests = 0
+        self.retries = 0
+
+    def _bucket(self) -> List[int]:
+        now = int(time.monotonic())
+        buckets = self._buckets
+        while buckets and buckets[0][0] <= now - self.window:
+            _, requests, retries = buckets.popleft()
+            self.requests -= requests
+            self.retries -= retries
+        if not buckets or buckets[-1][0] != now:
+            buckets.append([now, 0, 0])
+        return buckets[-1]
+
+    def record_request(self):
+        self._bucket()[1] += 1
+        self.requests += 1
+
+    def withdraw(self) -> bool:
+        """Take one retry from the budget; False when it is spent"""
+        bucket = self._bucket()
+        if self.retries >= self.min_per_second * self.window + self.ratio * self.requests:
+            return False
+        bucket[2] += 1
+        self.retries += 1
+        return True
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 2.0) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (1-based)"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class LatencyTracker:
+    """Percentile of the last `size` upstream latencies, recomputed every `every` samples"""
+
+    def __init__(self, percentile: float = 95.0, size: int = 512, every: int = 64, floor: float = 0.01):
+        self.percentile = percentile
+        self.every = every
+        self.floor = floor
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._pending = 0
+        self._threshold = None
+
+    def observe(self, latency: float):
+        self._samples.append(latency)
+        self._pending += 1
+        if self._threshold is None or self._pending >= self.every:
+            ordered = sorted(self._samples)
+            index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+            self._threshold = ordered[index]
+            self._pending = 0
+
+    def hedge_delay(self) -> float:
+        """How long to wait on the first attempt before sending a hedge"""
+        if self._threshold is None or len(self._samples) < self.every:
+            # Too few samples for a meaningful percentile: wait generously
+            return max(self.floor, (self._threshold or 1.0) * 2)
+        return max(self.floor, self._threshold)
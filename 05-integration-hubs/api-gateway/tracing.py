@@ -0,0 +1,337 @@
+"""
+Request tracing for the API Gateway
+Per-phase spans, W3C traceparent propagation, head/tail sampling,
+batched OTLP/JSON export and a Server-Timing breakdown
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from starlette.datastructures import Headers, MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+# Phases reported in Server-Timing, in this order
+SERVER_TIMING_PHASES = ("ratelimit", "queue", "connect", "ttfb", "body")
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    """(trace_id, parent_span_id, flags) from a W3C traceparent, or None if malformed"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff" or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        trace_id, span_id, flags = int(parts[1], 16), int(parts[2], 16), int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if trace_id == 0 or span_id == 0:
+        return None
+    return trace_id, span_id, flags
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "kind", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[int], kind: int, start: float, attributes: Optional[dict] = None):
+        self.name = name
+        self.span_id = random.getrandbits(64) or 1
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start = start
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error = False
+
+
+class Trace:
+    """Spans of one gateway request; timestamps are perf_counter() readings"""
+
+    __slots__ = ("trace_id", "sampled", "root", "spans", "start_ns")
+
+    def __init__(self, traceparent: Optional[str], sample_rate: float):
+        parsed = parse_traceparent(traceparent)
+        if parsed is not None:
+            # Head sampling: an upstream caller's decision wins
+            self.trace_id, parent_id, flags = parsed
+            self.sampled = bool(flags & 1)
+        else:
+            self.trace_id, parent_id = random.getrandbits(128) or 1, None
+            self.sampled = random.random() < sample_rate
+        self.start_ns = time.time_ns()
+        self.root = Span("gateway", parent_id, SERVER, time.perf_counter())
+        self.spans: List[Span] = [self.root]
+
+    def start_span(self, name: str, parent: Optional[Span] = None, kind: int = INTERNAL, **attributes) -> Span:
+        span = Span(name, (parent or self.root).span_id, kind, time.perf_counter(), attributes or None)
+        self.spans.append(span)
+        return span
+
+    def add_span(self, name: str, start: float, end: float, parent: Optional[Span] = None, **attributes) -> Span:
+        """Record an interval that was timed elsewhere"""
+        span = Span(name, (parent or self.root).span_id, INTERNAL, start, attributes or None)
+        span.end = end
+        self.spans.append(span)
+        return span
+
+    def traceparent(self, span: Span) -> str:
+        return f"00-{self.trace_id:032x}-{span.span_id:016x}-{'01' if self.sampled else '00'}"
+
+    def server_timing(self) -> str:
+        """Server-Timing value for the phases finished so far, summed per phase"""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            if span.end is not None and span.name in SERVER_TIMING_PHASES:
+                totals[span.name] = totals.get(span.name, 0.0) + span.end - span.start
+        entries = [f"{name};dur={totals[name] * 1000:.2f}" for name in SERVER_TIMING_PHASES if name in totals]
+        entries.append(f"total;dur={(time.perf_counter() - self.root.start) * 1000:.2f}")
+        return ", ".join(entries)
+
+
+class PhaseRecorder:
+    """httpcore trace hook for one upstream call: connect, time-to-first-byte and body spans
+
+    Installed as the request's "trace" extension, so close_upstream() can find
+    it again on response.request to close the body span.
+    """
+
+    __slots__ = ("trace", "span", "connect_start", "connect_end", "send_start", "headers_end")
+
+    def __init__(self, trace: Trace, span: Span):
+        self.trace = trace
+        self.span = span
+        self.connect_start = self.connect_end = self.send_start = self.headers_end = None
+
+    async def __call__(self, event_name: str, info: dict):
+        now = time.perf_counter()
+        _, step, edge = event_name.rsplit(".", 2)
+        if step in ("connect_tcp", "connect_unix_socket") and edge == "started":
+            self.connect_start = now
+        elif step in ("connect_tcp", "connect_unix_socket", "start_tls") and edge == "complete":
+            self.connect_end = now
+        elif step == "send_request_headers" and edge == "started":
+            self.send_start = now
+        elif step == "receive_response_headers" and edge == "complete":
+            self.headers_end = now
+
+    def response_started(self, status_code: int):
+        now = time.perf_counter()
+        if self.connect_start is not None:
+            self.trace.add_span("connect", self.connect_start, self.connect_end or now, self.span)
+        self.trace.add_span("ttfb", self.send_start or self.span.start, self.headers_end or now, self.span)
+        self.headers_end = self.headers_end or now
+        self.span.attributes = {**(self.span.attributes or {}), "http.status_code": status_code}
+        self.span.error = status_code >= 500
+
+    def finish(self, error: bool = False):
+        now = time.perf_counter()
+        if self.headers_end is not None:
+            self.trace.add_span("body", self.headers_end, now, self.span)
+        self.span.end = now
+        self.span.error = self.span.error or error
+
+
+def _attributes(attributes: Optional[dict]) -> List[dict]:
+    converted = []
+    for key, value in (attributes or {}).items():
+        if isinstance(value, bool):
+            converted.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            converted.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            converted.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            converted.append({"key": key, "value": {"stringValue": str(value)}})
+    return converted
+
+
+def to_otlp(traces: List[Trace], service_name: str) -> dict:
+    """OTLP/JSON ExportTraceServiceRequest for a batch of finished traces"""
+    spans = []
+    for trace in traces:
+        trace_id = f"{trace.trace_id:032x}"
+        origin = trace.root.start
+        end_default = trace.root.end or origin
+        for span in trace.spans:
+            spans.append({
+                "traceId": trace_id,
+                "spanId": f"{span.span_id:016x}",
+                "parentSpanId": f"{span.parent_id:016x}" if span.parent_id else "",
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(trace.start_ns + int((span.start - origin) * 1e9)),
+                "endTimeUnixNano": str(trace.start_ns + int(((span.end or end_default) - origin) * 1e9)),
+                "attributes": _attributes(span.attributes),
+                "status": {"code": 2 if span.error else 0},
+            })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _attributes({"service.name": service_name, "process.pid": os.getpid()})},
+            "scopeSpans": [{"scope": {"name": "api-gateway"}, "spans": spans}],
+        }]
+    }
+
+
+class FileSink:
+    """Append each batch as one OTLP/JSON line; '{pid}' in the path gives every worker its own file"""
+
+    def __init__(self, path: str):
+        self.path = path.format(pid=os.getpid())
+
+    def _write(self, payload: dict):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+    async def export(self, payload: dict):
+        await asyncio.to_thread(self._write, payload)
+
+    async def close(self):
+        pass
+
+
+class HttpSink:
+    """POST batches to an OTLP/HTTP JSON endpoint (e.g. http://collector:4318/v1/traces)"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = httpx.AsyncClient(timeout=5.0)
+
+    async def export(self, payload: dict):
+        response = await self.client.post(self.url, json=payload)
+        response.raise_for_status()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class BatchSpanExporter:
+    """Buffer finished traces and export them in batches off the request path
+
+    The buffer is bounded; when the sink falls behind, new traces are dropped
+    and counted rather than queued without limit.
+    """
+
+    def __init__(self, sink, service_name: str, max_batch: int = 512, max_queue: int = 8192, interval: float = 5.0):
+        self.sink = sink
+        self.service_name = service_name
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.interval = interval
+        self.dropped = 0
+        self._queue: deque = deque()
+        self._ready = asyncio.Event()
+
+    def submit(self, trace: Trace):
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(trace)
+        if len(self._queue) >= self.max_batch:
+            self._ready.set()
+
+    async def flush(self):
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            try:
+                await self.sink.export(to_otlp(batch, self.service_name))
+            except Exception as e:
+                logger.warning(f"Span export failed, dropping {len(batch)} traces: {e}")
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._ready.clear()
+            await self.flush()
+
+    async def close(self):
+        await self.flush()
+        await self.sink.close()
+
+
+class Tracer:
+    """Starts a Trace per request and decides at the end whether to export it
+
+    Head sampling keeps `sample_rate` of new traces (or follows the incoming
+    traceparent flag); tail sampling additionally keeps server errors and
+    requests slower than `slow_threshold` seconds. Unexported traces cost a few
+    small objects and perf_counter() calls.
+    """
+
+    def __init__(self, exporter: Optional[BatchSpanExporter], sample_rate: float = 0.01,
+                 slow_threshold: float = 1.0, keep_errors: bool = True):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.keep_errors = keep_errors
+
+    def start(self, traceparent: Optional[str]) -> Trace:
+        return Trace(traceparent, self.sample_rate)
+
+    def finish(self, trace: Trace, status_code: int):
+        root = trace.root
+        root.end = time.perf_counter()
+        root.error = status_code >= 500
+        if self.exporter is None:
+            return
+        if (
+            trace.sampled
+            or (self.keep_errors and root.error)
+            or (self.slow_threshold > 0 and root.end - root.start >= self.slow_threshold)
+        ):
+            self.exporter.submit(trace)
+
+
+def build_exporter(file_path: Optional[str], url: Optional[str], service_name: str) -> Optional[BatchSpanExporter]:
+    if url:
+        return BatchSpanExporter(HttpSink(url), service_name)
+    if file_path:
+        return BatchSpanExporter(FileSink(file_path), service_name)
+    return None
+
+
+class TracingMiddleware:
+    """Open a Trace for each HTTP request (request.state.trace) and add Server-Timing"""
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = self.tracer.start(Headers(scope=scope).get("traceparent"))
+        scope.setdefault("state", {})["trace"] = trace
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            route = scope.get("route")
+            trace.root.name = f"{scope['method']} {route.path if route is not None else 'unmatched'}"
+            trace.root.attributes = {
+                "http.method": scope["method"],
+                "http.route": route.path if route is not None else "unmatched",
+                "http.status_code": status_code,
+            }
+            self.tracer.finish(trace, status_code)
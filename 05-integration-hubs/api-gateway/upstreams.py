@@ -0,0 +1,212 @@
+"""
+Upstream replica management for the API Gateway
+Load balancing, active/passive health checking and per-service circuit breaking
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Outcomes that point at the replica rather than the request: the application's own
+# 500s (and 4xx) say nothing about whether the instance is healthy, and a PoolTimeout
+# is the gateway's own connection pool running dry
+FAILURE_STATUSES = frozenset({502, 503, 504})
+FAILURE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout, httpx.WriteTimeout)
+
+
+def upstream_outcome(response: Optional[httpx.Response] = None, error: Optional[BaseException] = None) -> Optional[bool]:
+    """Verdict for report(): False for replica failures, True for other responses, None otherwise"""
+    if error is not None:
+        return False if isinstance(error, FAILURE_ERRORS) else None
+    return response.status_code not in FAILURE_STATUSES
+
+
+class UpstreamUnavailable(Exception):
+    """The service's circuit is open; callers should fail fast"""
+
+    def __init__(self, service: str, reason: str, retry_after: float):
+        super().__init__(f"Service '{service}' unavailable: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Replica:
+    """One upstream instance and its load/health bookkeeping"""
+
+    # Consecutive active-check results needed to flip health state
+    UNHEALTHY_THRESHOLD = 2
+    HEALTHY_THRESHOLD = 1
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.healthy = True
+        self.ejected_until = 0.0
+        self.ejection_count = 0
+        self.consecutive_failures = 0
+        self._check_failures = 0
+        self._check_successes = 0
+
+    def is_available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def record_check(self, ok: bool):
+        if ok:
+            self._check_failures = 0
+            self._check_successes += 1
+            if not self.healthy and self._check_successes >= self.HEALTHY_THRESHOLD:
+                logger.info(f"Replica {self.url} passed health checks")
+                self.healthy = True
+        else:
+            self._check_successes = 0
+            self._check_failures += 1
+            if self.healthy and self._check_failures >= self.UNHEALTHY_THRESHOLD:
+                logger.warning(f"Replica {self.url} failed health checks")
+                self.healthy = False
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures; half-open probes after a cool-down"""
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+
+    def allow(self, now: float) -> bool:
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self.probes_in_flight = 0
+        if self.state == self.HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_probes:
+                return False
+            self.probes_in_flight += 1
+        return True
+
+    def retry_after(self, now: float) -> float:
+        return max(self.reset_timeout - (now - self.opened_at), 1.0)
+
+    def record(self, success: Optional[bool], now: float):
+        """Record an outcome; None frees a half-open probe slot without a verdict"""
+        if self.state == self.HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+        if success is None:
+            return
+        if success:
+            self.failures = 0
+            self.state = self.CLOSED
+            return
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = now
+
+
+class UpstreamGroup:
+    """Replicas of one service, balanced by least-outstanding or power-of-two-choices"""
+
+    def __init__(
+        self,
+        name: str,
+        urls: List[str],
+        strategy: str = "p2c",
+        breaker: Optional[CircuitBreaker] = None,
+        ejection_failures: int = 5,
+        ejection_time: float = 30.0,
+        max_ejection_percent: int = 50,
+    ):
+        if strategy not in ("p2c", "least_outstanding"):
+            raise ValueError(f"Unknown load balancing strategy: {strategy}")
+        self.name = name
+        self.replicas = [Replica(url) for url in urls]
+        self.strategy = strategy
+        self.breaker = breaker or CircuitBreaker()
+        self.ejection_failures = ejection_failures
+        self.ejection_time = ejection_time
+        self.max_ejection_percent = max_ejection_percent
+
+    def acquire(self) -> Replica:
+        """Pick a replica and count the request against it"""
+        now = time.monotonic()
+        if not self.breaker.allow(now):
+            raise UpstreamUnavailable(self.name, "circuit open", self.breaker.retry_after(now))
+
+        # With nothing available, route to every replica: a possibly-bad replica beats a certain 503
+        candidates = [replica for replica in self.replicas if replica.is_available(now)] or self.replicas
+
+        if len(candidates) == 1:
+            replica = candidates[0]
+        elif self.strategy == "p2c":
+            first, second = random.sample(candidates, 2)
+            replica = first if first.outstanding <= second.outstanding else second
+        else:
+            replica = min(candidates, key=lambda r: r.outstanding)
+
+        replica.outstanding += 1
+        return replica
+
+    def release(self, replica: Replica):
+        replica.outstanding -= 1
+
+    def report(self, replica: Replica, success: Optional[bool]):
+        """Passive health: feed the outcome to outlier ejection and the breaker"""
+        now = time.monotonic()
+        self.breaker.record(success, now)
+        if success is None:
+            return
+        if success:
+            replica.consecutive_failures = 0
+            return
+        replica.consecutive_failures += 1
+        if replica.consecutive_failures >= self.ejection_failures and self._can_eject(now):
+            replica.ejection_count += 1
+            # Repeat offenders stay out longer, capped at ten base periods
+            replica.ejected_until = now + self.ejection_time * min(replica.ejection_count, 10)
+            replica.consecutive_failures = 0
+            logger.warning(f"Ejected {replica.url} from '{self.name}' for {replica.ejected_until - now:.0f}s")
+
+    def _can_eject(self, now: float) -> bool:
+        ejected = sum(1 for replica in self.replicas if replica.ejected_until > now)
+        # Never past the percentage cap, so a single-replica group is never ejected
+        return (ejected + 1) * 100 <= self.max_ejection_percent * len(self.replicas)
+
+    def state_counts(self) -> dict:
+        now = time.monotonic()
+        counts = {"available": 0, "ejected": 0, "unhealthy": 0}
+        for replica in self.replicas:
+            if not replica.healthy:
+                counts["unhealthy"] += 1
+            elif replica.ejected_until > now:
+                counts["ejected"] += 1
+            else:
+                counts["available"] += 1
+        return counts
+
+    async def run_health_checks(self, client: httpx.AsyncClient, path: str, interval: float, timeout: float):
+        """Active checks: probe every replica each interval until cancelled"""
+        while True:
+            await asyncio.gather(*(self._check(client, replica, path, timeout) for replica in self.replicas))
+            await asyncio.sleep(interval)
+
+    async def _check(self, client: httpx.AsyncClient, replica: Replica, path: str, timeout: float):
+        try:
+            response = await client.get(f"{replica.url}{path}", timeout=timeout)
+            replica.record_check(response.status_code < 500)
+        except httpx.HTTPError:
+            replica.record_check(False)
@@ -3,6 +3,9 @@
 AUTOHELIX Initialization Script (Python Version)
 Complete deployment automation for harmonized enterprise ecosystem
 
+Phases and their steps form a dependency graph; every step starts as soon as
+the steps it needs are done, and the run ends with a timing and critical-path report
+
 Usage:
     python3 autohelix-init.py \
         --cloud=aws \
@@ -11,14 +14,97 @@ Usage:
         --target-revenue=1M/year \
         --enable-self-building \
         --enable-self-healing
+
+    # Unattended, with the report as JSON
+    python3 autohelix-init.py --cloud=aws --yes --report=autohelix-report.json
+
+    # Show the plan and predicted timings without deploying
+    python3 autohelix-init.py --cloud=aws --enable-self-healing --dry-run
 """
 
 import argparse
+import asyncio
 import json
 import sys
 import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class Step:
+    name: str
+    description: str
+    duration: float = 0.3  # Simulated seconds
+    needs: Tuple[str, ...] = ()  # Steps of the same phase
+
+
+@dataclass
+class Phase:
+    name: str
+    title: str
+    steps: List[Step]
+    needs: Tuple[str, ...] = ()  # Phases whose steps must all finish before this one starts
+    requires: Optional[str] = None  # Config flag that enables the phase
+
+
+PHASES = [
+    Phase("infrastructure", "Infrastructure Analysis", [
+        Step("permissions", "Scanning {cloud} account permissions"),
+        Step("resources", "Detecting existing resources", needs=("permissions",)),
+        Step("network", "Analyzing network topology", needs=("permissions",)),
+        Step("distribution", "Calculating optimal resource distribution", needs=("resources", "network")),
+        Step("costs", "Estimating baseline costs", needs=("distribution",)),
+    ]),
+    # Generating code needs no account access, so it runs alongside the analysis
+    Phase("codegen", "Code Generation", [
+        Step("terraform", "Generating Terraform infrastructure code"),
+        Step("docker", "Building Docker configurations"),
+        Step("kubernetes", "Creating Kubernetes manifests", needs=("docker",)),
+        Step("gateway", "Synthesizing API gateway configs"),
+        Step("dashboards", "Compiling monitoring dashboards"),
+    ]),
+    Phase("quantum", "Quantum Kernel Bootstrap", [
+        Step("qaoa", "Initializing QAOA optimization engine"),
+        Step("calibration", "Calibrating quantum circuits", needs=("qaoa",)),
+        Step("braket", "Testing AWS Braket connectivity"),
+        Step("benchmark", "Running benchmark suite (20 services)", needs=("calibration", "braket")),
+        Step("speedup", "Verifying 175.41x speedup achievement", needs=("benchmark",)),
+    ], needs=("infrastructure",)),
+    Phase("blockchain", "Blockchain Integration", [
+        Step("polygon", "Connecting to Polygon mainnet"),
+        Step("contracts", "Deploying NWU smart contracts", needs=("polygon",)),
+        Step("ipfs", "Initializing IPFS nodes"),
+        Step("bonds", "Creating liquidity bond templates", needs=("contracts",)),
+        Step("truth_graph", "Configuring truth graph database", needs=("ipfs",)),
+    ], needs=("infrastructure",)),
+    Phase("services", "Service Deployment", [
+        Step("postgres", "Deploying PostgreSQL cluster (multi-region)", 0.2),
+        Step("redis", "Starting Redis cache layer", 0.2),
+        Step("kafka", "Launching Kafka streaming pipeline", 0.2),
+        Step("rabbitmq", "Initializing RabbitMQ message broker", 0.2),
+        Step("backend", "Deploying FastAPI backend services", 0.2, needs=("postgres", "redis", "kafka", "rabbitmq")),
+        Step("frontend", "Starting Next.js frontend applications", 0.2, needs=("backend",)),
+        Step("nginx", "Configuring NGINX load balancers", 0.2, needs=("frontend",)),
+        Step("health", "Enabling health check monitors", 0.2, needs=("nginx",)),
+    ], needs=("infrastructure", "codegen")),
+    Phase("ai", "AI Learning Bootstrap", [
+        Step("traffic", "Loading historical traffic patterns"),
+        Step("models", "Training predictive models", needs=("traffic",)),
+        Step("anomaly", "Calibrating anomaly detectors", needs=("traffic",)),
+        Step("baseline", "Setting baseline performance metrics"),
+        Step("rl", "Initializing reinforcement learning loops", needs=("models", "anomaly", "baseline")),
+    ], needs=("services",)),
+    Phase("self_healing", "Self-Healing Activation", [
+        Step("breakers", "Enabling circuit breakers"),
+        Step("mesh", "Activating fractal replication mesh"),
+        Step("chaos", "Starting chaos engineering experiments", needs=("breakers", "mesh")),
+        Step("remediation", "Configuring auto-remediation rules"),
+        Step("failover", "Testing failover scenarios", needs=("chaos", "remediation")),
+    ], needs=("services", "ai"), requires="self_healing"),
+]
+
 
 class AutohelixDeployer:
     def __init__(self, config: Dict):
@@ -46,108 +132,166 @@ class AutohelixDeployer:
         print(f"  Predictive Scaling: \033[92m{self.config['predictive_scaling']}\033[0m")
         print()
         
-    def phase_infrastructure_analysis(self):
-        print("\033[95m▶️  Phase 1: Infrastructure Analysis\033[0m")
-        tasks = [
-            "Scanning AWS account permissions",
-            "Detecting existing resources",
-            "Analyzing network topology",
-            "Calculating optimal resource distribution",
-            "Estimating baseline costs"
-        ]
-        for task in tasks:
-            time.sleep(0.3)
-            print(f"\033[92m   ✓ {task}\033[0m")
-        print()
+    def build_graph(self) -> Dict[str, List[str]]:
+        """Step id -> ids of the steps it waits for, over the enabled phases
         
-    def phase_code_generation(self):
-        print("\033[95m▶️  Phase 2: Code Generation\033[0m")
-        tasks = [
-            "Generating Terraform infrastructure code",
-            "Creating Kubernetes manifests",
-            "Building Docker configurations",
-            "Synthesizing API gateway configs",
-            "Compiling monitoring dashboards"
-        ]
-        for task in tasks:
-            time.sleep(0.3)
-            print(f"\033[92m   ✓ {task}\033[0m")
-        print()
+        A step's `needs` name steps of its own phase; steps with none wait for
+        every step of the phases their phase `needs`.
+        """
+        phases = {phase.name: phase for phase in self.enabled_phases()}
+        graph: Dict[str, List[str]] = {}
+        self.steps: Dict[str, Step] = {}
+        self.phase_of: Dict[str, Phase] = {}
+        for phase in phases.values():
+            names = {step.name for step in phase.steps}
+            after = [f"{name}.{step.name}" for name in phase.needs if name in phases for step in phases[name].steps]
+            for step in phase.steps:
+                unknown = set(step.needs) - names
+                if unknown:
+                    raise ValueError(f"Step {phase.name}.{step.name} needs unknown steps: {', '.join(sorted(unknown))}")
+                step_id = f"{phase.name}.{step.name}"
+                graph[step_id] = [f"{phase.name}.{name}" for name in step.needs] or after
+                self.steps[step_id] = step
+                self.phase_of[step_id] = phase
+        return graph
         
-    def phase_quantum_bootstrap(self):
-        print("\033[95m▶️  Phase 3: Quantum Kernel Bootstrap\033[0m")
-        tasks = [
-            "Initializing QAOA optimization engine",
-            "Calibrating quantum circuits",
-            "Testing AWS Braket connectivity",
-            "Running benchmark suite (20 services)",
-            "Verifying 175.41x speedup achievement"
-        ]
-        for task in tasks:
-            time.sleep(0.3)
-            print(f"\033[92m   ✓ {task}\033[0m")
-        print()
+    def describe(self, step_id: str) -> str:
+        return self.steps[step_id].description.format(cloud=self.config['cloud'].upper())
         
-    def phase_blockchain_integration(self):
-        print("\033[95m▶️  Phase 4: Blockchain Integration\033[0m")
-        tasks = [
-            "Connecting to Polygon mainnet",
-            "Deploying NWU smart contracts",
-            "Initializing IPFS nodes",
-            "Creating liquidity bond templates",
-            "Configuring truth graph database"
-        ]
-        for task in tasks:
-            time.sleep(0.3)
-            print(f"\033[92m   ✓ {task}\033[0m")
+    def print_plan(self, graph: Dict[str, List[str]]):
+        print("\033[96m🗺️  Deployment Plan:\033[0m")
+        for number, phase in enumerate(self.enabled_phases(), 1):
+            after = f" \033[90m(after {', '.join(phase.needs)})\033[0m" if phase.needs else ""
+            print(f"\033[95m▶️  Phase {number}: {phase.title}\033[0m{after}")
+            for step in phase.steps:
+                needs = f" \033[90m← {', '.join(step.needs)}\033[0m" if step.needs else ""
+                print(f"   • {step.description.format(cloud=self.config['cloud'].upper())}{needs}")
         print()
         
-    def phase_service_deployment(self):
-        print("\033[95m▶️  Phase 5: Service Deployment\033[0m")
-        tasks = [
-            "Deploying PostgreSQL cluster (multi-region)",
-            "Starting Redis cache layer",
-            "Launching Kafka streaming pipeline",
-            "Initializing RabbitMQ message broker",
-            "Deploying FastAPI backend services",
-            "Starting Next.js frontend applications",
-            "Configuring NGINX load balancers",
-            "Enabling health check monitors"
-        ]
-        for task in tasks:
-            time.sleep(0.2)
-            print(f"\033[92m   ✓ {task}\033[0m")
-        print()
+    def enabled_phases(self) -> List[Phase]:
+        return [phase for phase in PHASES if phase.requires is None or self.config[phase.requires]]
         
-    def phase_ai_bootstrap(self):
-        print("\033[95m▶️  Phase 6: AI Learning Bootstrap\033[0m")
-        tasks = [
-            "Loading historical traffic patterns",
-            "Training predictive models",
-            "Calibrating anomaly detectors",
-            "Setting baseline performance metrics",
-            "Initializing reinforcement learning loops"
-        ]
-        for task in tasks:
-            time.sleep(0.3)
-            print(f"\033[92m   ✓ {task}\033[0m")
+    async def run_graph(self, graph: Dict[str, List[str]]) -> Dict[str, Tuple[float, float]]:
+        """Run every step as soon as the steps it needs are done; (start, finish) per step"""
+        dependents: Dict[str, List[str]] = {step_id: [] for step_id in graph}
+        waiting = {step_id: len(needs) for step_id, needs in graph.items()}
+        for step_id, needs in graph.items():
+            for need in needs:
+                dependents[need].append(step_id)
+        numbers = {phase.name: number for number, phase in enumerate(self.enabled_phases(), 1)}
+        started_phases = set()
+        timings: Dict[str, Tuple[float, float]] = {}
+        origin = time.perf_counter()
+        
+        async def run_step(step_id: str) -> str:
+            phase = self.phase_of[step_id]
+            if phase.name not in started_phases:
+                started_phases.add(phase.name)
+                print(f"\033[95m▶️  Phase {numbers[phase.name]}: {phase.title}\033[0m")
+            start = time.perf_counter() - origin
+            # Simulated work; a real step would await its provisioning call here
+            await asyncio.sleep(self.steps[step_id].duration)
+            timings[step_id] = (start, time.perf_counter() - origin)
+            # Phases overlap, so each line says which one it belongs to
+            print(f"\033[92m   ✓ [{numbers[phase.name]}] {self.describe(step_id)}\033[0m "
+                  f"\033[90m({timings[step_id][1] - start:.2f}s)\033[0m")
+            return step_id
+        
+        running = {asyncio.create_task(run_step(step_id)) for step_id, count in waiting.items() if count == 0}
+        while running:
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                for dependent in dependents[finished.result()]:
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        running.add(asyncio.create_task(run_step(dependent)))
+        if len(timings) != len(graph):
+            raise ValueError(f"Dependency cycle among steps: {', '.join(sorted(set(graph) - set(timings)))}")
         print()
+        return timings
         
-    def phase_self_healing(self):
-        if not self.config['self_healing']:
-            return
-            
-        print("\033[95m▶️  Phase 7: Self-Healing Activation\033[0m")
-        tasks = [
-            "Enabling circuit breakers",
-            "Activating fractal replication mesh",
-            "Starting chaos engineering experiments",
-            "Configuring auto-remediation rules",
-            "Testing failover scenarios"
-        ]
-        for task in tasks:
-            time.sleep(0.3)
-            print(f"\033[92m   ✓ {task}\033[0m")
+    def simulate(self, graph: Dict[str, List[str]]) -> Dict[str, Tuple[float, float]]:
+        """Predicted (start, finish) per step from declared durations, as run_graph would schedule them"""
+        timings: Dict[str, Tuple[float, float]] = {}
+        
+        def visit(step_id: str, path: Tuple[str, ...] = ()) -> float:
+            if step_id in path:
+                raise ValueError(f"Dependency cycle among steps: {' → '.join(path + (step_id,))}")
+            if step_id not in timings:
+                start = max((visit(need, path + (step_id,)) for need in graph[step_id]), default=0.0)
+                timings[step_id] = (start, start + self.steps[step_id].duration)
+            return timings[step_id][1]
+        
+        for step_id in graph:
+            visit(step_id)
+        return timings
+        
+    def build_report(self, graph: Dict[str, List[str]], timings: Dict[str, Tuple[float, float]],
+                     dry_run: bool) -> Dict:
+        """Per-phase and per-step timings plus the critical path through the steps"""
+        # Walk back from the last step to finish through whichever need finished last
+        step_id = max(timings, key=lambda s: timings[s][1])
+        path = [step_id]
+        while graph[step_id]:
+            step_id = max(graph[step_id], key=lambda s: timings[s][1])
+            path.append(step_id)
+        path.reverse()
+        
+        wall = max(finish for _, finish in timings.values())
+        work = sum(finish - start for start, finish in timings.values())
+        phases = []
+        for phase in self.enabled_phases():
+            spans = [timings[f"{phase.name}.{step.name}"] for step in phase.steps]
+            start, finish = min(s for s, _ in spans), max(f for _, f in spans)
+            phases.append({
+                "name": phase.name,
+                "title": phase.title,
+                "start": round(start, 3),
+                "finish": round(finish, 3),
+                "duration": round(finish - start, 3),
+                "work": round(sum(f - s for s, f in spans), 3),
+                "on_critical_path": any(step_id.startswith(f"{phase.name}.") for step_id in path),
+            })
+        return {
+            "deployment_id": self.deployment_id,
+            "dry_run": dry_run,
+            "wall_seconds": round(wall, 3),
+            "sequential_seconds": round(work, 3),
+            "speedup": round(work / wall, 2) if wall else None,
+            "critical_path": path,
+            "critical_path_seconds": round(sum(timings[s][1] - timings[s][0] for s in path), 3),
+            "phases": phases,
+            "steps": [
+                {
+                    "id": step_id,
+                    "description": self.describe(step_id),
+                    "needs": graph[step_id],
+                    "start": round(start, 3),
+                    "finish": round(finish, 3),
+                    "duration": round(finish - start, 3),
+                }
+                for step_id, (start, finish) in sorted(timings.items(), key=lambda item: item[1])
+            ],
+        }
+        
+    def print_report(self, report: Dict):
+        label = "Predicted Timing" if report["dry_run"] else "Timing Report"
+        critical = set(report["critical_path"])
+        print(f"\033[96m⏱️  {label}:\033[0m")
+        print(f"  {'':<46} {'start':>7} {'finish':>7} {'time':>7}")
+        for phase in report["phases"]:
+            marker = "\033[93m★\033[0m" if phase["on_critical_path"] else " "
+            print(f"{marker} \033[95m{phase['title']:<46}\033[0m {phase['start']:>6.2f}s {phase['finish']:>6.2f}s "
+                  f"{phase['duration']:>6.2f}s")
+            for step in report["steps"]:
+                if step["id"].startswith(f"{phase['name']}."):
+                    marker = "\033[93m★\033[0m" if step["id"] in critical else " "
+                    print(f"  {marker} {step['description'][:44]:<44} {step['start']:>6.2f}s {step['finish']:>6.2f}s "
+                          f"{step['duration']:>6.2f}s")
+        print()
+        print(f"  Wall time: \033[92m{report['wall_seconds']:.2f}s\033[0m "
+              f"(steps back to back: {report['sequential_seconds']:.2f}s, {report['speedup']}x)")
+        print(f"  Critical path (★, {report['critical_path_seconds']:.2f}s): {' → '.join(report['critical_path'])}")
         print()
         
     def print_success(self):
@@ -206,34 +350,50 @@ class AutohelixDeployer:
         print(f"\033[94m🎯 Target: ${self.config['target_revenue']}/year revenue on track\033[0m")
         print()
         
-    def deploy(self):
+    def write_report(self, report: Dict, path: Optional[str]):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\033[96m📝 Report written to {path}\033[0m\n")
+        
+    def deploy(self, assume_yes: bool = False, dry_run: bool = False, report_path: Optional[str] = None):
         """Execute full deployment sequence"""
         self.print_banner()
         self.print_config()
+        graph = self.build_graph()
+        
+        if dry_run:
+            self.print_plan(graph)
+            report = self.build_report(graph, self.simulate(graph), dry_run=True)
+            self.print_report(report)
+            self.write_report(report, report_path)
+            print("\033[93mDry run: nothing was deployed\033[0m")
+            return
         
         # Confirmation
-        response = input("\033[93mProceed with deployment? [y/N]: \033[0m")
-        if response.lower() != 'y':
-            print("\033[91mDeployment cancelled\033[0m")
-            sys.exit(0)
+        if not assume_yes:
+            if not sys.stdin.isatty():
+                print("\033[91mNot a terminal; pass --yes to deploy without confirmation\033[0m")
+                sys.exit(1)
+            response = input("\033[93mProceed with deployment? [y/N]: \033[0m")
+            if response.lower() != 'y':
+                print("\033[91mDeployment cancelled\033[0m")
+                sys.exit(0)
         
         print()
         print("\033[94m🚀 Starting AUTOHELIX initialization...\033[0m\n")
         
-        # Execute phases
-        self.phase_infrastructure_analysis()
-        self.phase_code_generation()
-        self.phase_quantum_bootstrap()
-        self.phase_blockchain_integration()
-        self.phase_service_deployment()
-        self.phase_ai_bootstrap()
-        self.phase_self_healing()
+        # Execute phases, each step as soon as its dependencies are done
+        timings = asyncio.run(self.run_graph(graph))
         
         # Success
         self.status = "OPERATIONAL"
         self.print_success()
         self.print_summary()
         self.print_next_steps()
+        report = self.build_report(graph, timings, dry_run=False)
+        self.print_report(report)
+        self.write_report(report, report_path)
 
 def main():
     parser = argparse.ArgumentParser(
@@ -253,6 +413,12 @@ def main():
                        help='Enable self-healing capabilities')
     parser.add_argument('--enable-predictive-scaling', action='store_true',
                        help='Enable predictive scaling')
+    parser.add_argument('--yes', '-y', action='store_true',
+                       help='Deploy without asking for confirmation')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='Show the plan and predicted timings without deploying')
+    parser.add_argument('--report',
+                       help='Write the timing and critical-path report as JSON to this file')
     
     args = parser.parse_args()
     
@@ -267,7 +433,7 @@ def main():
     }
     
     deployer = AutohelixDeployer(config)
-    deployer.deploy()
+    deployer.deploy(assume_yes=args.yes, dry_run=args.dry_run, report_path=args.report)
 
 if __name__ == '__main__':
     main()